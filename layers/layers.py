@@ -171,9 +171,10 @@ def Dense(shape, activation=default_override_or(identity), init=default_override
     return dense
 
 
-def Embedding(shape=None, init=default_override_or(C.glorot_uniform()), weights=None, enable_weight_tying=False, name=''):
+def Embedding(shape=None, init=default_override_or(C.glorot_uniform()), weights=None, enable_weight_tying=False,
+              index_input: bool = False, input_dim: int = None, name=''):
     '''
-    Embedding(shape=None, init=glorot_uniform(), weights=None, enable_weight_tying=False, name='')
+    Embedding(shape=None, init=glorot_uniform(), weights=None, enable_weight_tying=False, index_input=False, input_dim=None, name='')
 
     Layer factory function to create a embedding layer.
 
@@ -198,6 +199,14 @@ def Embedding(shape=None, init=default_override_or(C.glorot_uniform()), weights=
 
     An ``Embedding`` instance owns its weight parameter tensor `E`, and exposes it as an attribute ``.E``.
 
+    With ``index_input=True``, the input is the integer id of the token, of shape (1, ), instead of a one-hot vector
+    and the lookup is a row gather. The input is then ``vocabulary size`` times smaller and there is no matrix
+    product. The size of the lookup table must be known, either from ``weights``, a numpy ``init`` or ``input_dim``.
+    The tied output embedding (``enable_weight_tying=True``) is the same in both modes.
+
+    Sparse one-hot inputs (``C.input_variable(vocab_size, is_sparse=True)``) are also looked up efficiently
+    in the default mode, so the one-hot vectors need never be dense.
+
     Example:
      >>> # learnable embedding
      >>> f = Embedding(5)
@@ -223,12 +232,24 @@ def Embedding(shape=None, init=default_override_or(C.glorot_uniform()), weights=
             [ 0.5,  0.3,  0.1,  0.4,  0.2],
             [ 0.7,  0.6,  0.3,  0.2,  0.9]], dtype=float32)
 
+     >>> # token ids instead of one-hot vectors
+     >>> f = Embedding(5, index_input=True, input_dim=3)
+     >>> x = C.input_variable(1)
+     >>> e = f(x)
+     >>> e.shape
+         (5,)
+     >>> f.E.shape
+         (3, 5)
+
     Args:
      shape (`int` or `tuple` of `ints`): vector or tensor dimension of the output of this layer
      init (scalar or NumPy array or :mod:`cntk.initializer`, defaults to :func:`~cntk.initializer.glorot_uniform` ): (learnable embedding only) initial value of weights `E`
      weights (NumPy array, mutually exclusive with ``init``, defuats to `None`): (user-supplied embedding only) the lookup table.
       The matrix rows are the embedding vectors, ``weights[i,:]`` being the embedding that corresponds to input category `i`.
      enable_weight_tying (bool): whether to produce both an input and output embedding for weight tying.
+     index_input (bool): whether the input is the integer id of the token instead of a one-hot vector.
+     input_dim (int): number of rows of the lookup table (e.g. vocabulary size). Required for a learnable embedding
+      with ``index_input`` unless ``init`` is a numpy array.
      name (str, defaults to ''): the name of the function instance in the network
 
     Returns:
@@ -246,7 +267,10 @@ def Embedding(shape=None, init=default_override_or(C.glorot_uniform()), weights=
             raise ValueError('Embedding: output shape must be specified')
         init = get_default_override(Embedding, init=init)
         shape = _as_tuple(shape)
-        weight_shape = _INFERRED + shape
+        if index_input and input_dim is None and not isinstance(init, np.ndarray):
+            raise ValueError('Embedding: input_dim must be specified for index input')
+
+        weight_shape = (input_dim, ) + shape if input_dim and not isinstance(init, np.ndarray) else _INFERRED + shape
         E = C.Parameter(weight_shape, init=init, name='E')
     # weights given: use them as constant
     else:
@@ -258,9 +282,15 @@ def Embedding(shape=None, init=default_override_or(C.glorot_uniform()), weights=
         E = C.Constant(weights, name='E')
 
     # expression
-    @C.BlockFunction('Embedding', name)
-    def embed(x):
-        return C.times(x, E)
+    if index_input:
+        @C.BlockFunction('Embedding', name)
+        def embed(x):
+            # x: [#, *] [1, ] token ids
+            return C.reshape(C.gather(E, x), E.shape[1:])
+    else:
+        @C.BlockFunction('Embedding', name)
+        def embed(x):
+            return C.times(x, E)
 
     # expression
     @C.BlockFunction('TransposeEmbedding', name)
@@ -307,8 +337,47 @@ def SequentialDense(shape, window: int, stride: int, causal: bool = False, activ
     return inner
 
 
+def _parallel_f_pool(z, f, max_seq_len: int, backward_dim: int = 0, initial_state=None):
+    """ f-pooling c_t = f_t * c_(t-1) + (1 - f_t) * z_t as a log-depth (Hillis-Steele) scan along the sequence.
+
+    The recurrence is linear, so every step composes (f, (1 - f) * z) with the item `2 ** i` steps back:
+    (a1, b1) followed by (a2, b2) is (a1 * a2, a2 * b1 + b2).
+
+    The last `backward_dim` features are pooled from the end of the sequence towards the start instead,
+    so both directions of a bidirectional layer are scanned in the same pass.
+
+    `initial_state` (not a sequence tensor) is the cell state before the first item of the forward direction.
+    """
+    steps = (max_seq_len - 1).bit_length()  # number of doubling steps to cover max_seq_len
+
+    def shift(u, offset, fill_value):
+        """ shift sequence by offset, filling items shifted in from beyond the sequence with fill_value """
+        past = C.sequence.past_value(u, initial_state=fill_value, time_step=offset)
+
+        if backward_dim == 0:
+            return past
+
+        future = C.sequence.future_value(u, initial_state=fill_value, time_step=offset)
+        return C.splice(C.slice(past, -1, 0, -backward_dim), C.slice(future, -1, -backward_dim, 0), axis=-1)
+
+    # (1, 0) is the identity of the composition and so fills the items beyond either end of the sequence
+    a = f
+    b = (1 - f) * z
+
+    for i in range(steps):
+        b = a * shift(b, 2 ** i, 0) + b
+        a = a * shift(a, 2 ** i, 1)
+
+    if initial_state is not None:
+        # a is now the product of all forget gates up to and including every item
+        b = b + a * C.sequence.broadcast_as(initial_state, b)
+
+    return b
+
+
 def QRNN(window: int = 1, hidden_dim=None, activation=C.tanh, return_full_state=False,
-         variational_dropout_rate_input=None, variational_dropout_rate_output=None, name=''):
+         variational_dropout_rate_input=None, variational_dropout_rate_output=None,
+         parallel_scan: bool = False, max_seq_len: int = 2 ** 16, streaming: bool = False, name=''):
     """
     Quasi-Recurrent Neural Networks layer
 
@@ -345,6 +414,18 @@ def QRNN(window: int = 1, hidden_dim=None, activation=C.tanh, return_full_state=
         hidden_dim (int): size of hidden dim of h, c and o
         activation: cell activation function
         return_full_state: if to return cell and hidden states. Default false.
+        variational_dropout_rate_input (float): variational dropout on the input of f-pooling
+        variational_dropout_rate_output (float): variational dropout on the output of f-pooling
+        parallel_scan (bool): compute f-pooling with a log-depth parallel scan along the sequence instead of
+          a sequential recurrence. Much faster on long sequences, but cannot be used inside a recurrence loop that
+          steps over the same sequence axis.
+        max_seq_len (int): upper bound on the sequence length, only used with `parallel_scan`.
+          Determines the number of scan steps (log2(max_seq_len)), each linear in the actual sequence length.
+        streaming (bool): evaluate the layer chunk by chunk, e.g. on live audio. The layer then takes the chunk,
+          the last `window - 1` input frames of the previous chunk (only if `window > 1`, shape (window - 1, input_dim),
+          zeros at the start of the stream) and the last cell state (shape (hidden_dim, ), zeros at the start).
+          It returns the outputs followed by the new frames and cell state to pass in with the next chunk.
+          Streamed outputs are identical to evaluating the whole sequence at once. Variational dropout is not applied.
         name: name of function instance in network
 
     Returns:
@@ -354,12 +435,26 @@ def QRNN(window: int = 1, hidden_dim=None, activation=C.tanh, return_full_state=
     """
     dense = Dense(shape=(3 * hidden_dim,), name='qrnn_dense')
 
+    dropout_input = dropout_output = None
+    if parallel_scan and variational_dropout_rate_input:
+        dropout_input = Cx.layers.VariationalDropout(variational_dropout_rate_input, name='variational_dropout_input')
+
+    if parallel_scan and variational_dropout_rate_output:
+        dropout_output = Cx.layers.VariationalDropout(variational_dropout_rate_output, name='variational_dropout_output')
+
     @C.Function
     def f_pool(c, zf):
         z = C.slice(zf, 0, 0, hidden_dim)
         f = C.slice(zf, 0, hidden_dim, 2 * hidden_dim)
         return f * c + (1 - f) * z
 
+    def gates(gate_values):
+        x = C.slice(gate_values, -1, 0, hidden_dim)
+        forget = C.slice(gate_values, -1, hidden_dim, 2 * hidden_dim)
+        output = C.slice(gate_values, -1, 2 * hidden_dim, 3 * hidden_dim)
+
+        return activation(x), C.sigmoid(forget), C.sigmoid(output)
+
     @C.BlockFunction('QRNN', name)
     def model(input_tensor):
 
@@ -368,21 +463,20 @@ def QRNN(window: int = 1, hidden_dim=None, activation=C.tanh, return_full_state=
             # ensures causal relation is still preserved
             input_sequence = Cx.sequence.window_causal(input_tensor, window, slide=1)
 
-        gate_values = dense(input_sequence)
-
-        x = C.slice(gate_values, -1, 0, hidden_dim)
-        forget = C.slice(gate_values, -1, hidden_dim, 2 * hidden_dim)
-        output = C.slice(gate_values, -1, 2 * hidden_dim, 3 * hidden_dim)
-
-        z = activation(x)
-        f = C.sigmoid(forget)
-        o = C.sigmoid(output)
+        z, f, o = gates(dense(input_sequence))
 
         # Pooling
         zf = C.splice(z, f)
-        c = Cx.layers.Recurrence(f_pool,
-                                 dropout_rate_input=variational_dropout_rate_input,
-                                 dropout_rate_output=variational_dropout_rate_output)(zf)
+
+        if parallel_scan:
+            zf = dropout_input(zf) if dropout_input else zf
+            c = _parallel_f_pool(C.slice(zf, 0, 0, hidden_dim), C.slice(zf, 0, hidden_dim, 2 * hidden_dim), max_seq_len)
+            c = dropout_output(c) if dropout_output else c
+        else:
+            c = Cx.layers.Recurrence(f_pool,
+                                     dropout_rate_input=variational_dropout_rate_input,
+                                     dropout_rate_output=variational_dropout_rate_output)(zf)
+
         h = o * c  # o pool
 
         if return_full_state:
@@ -390,10 +484,161 @@ def QRNN(window: int = 1, hidden_dim=None, activation=C.tanh, return_full_state=
         else:
             return h
 
+    def stream(input_tensor, cell, past_inputs=None):
+        new_state = ()
+        if past_inputs is None:
+            gate_values = dense(input_tensor)
+        else:
+            # window over the frames carried from the previous chunk followed by this chunk
+            y, new_past_inputs = Cx.sequence._prepend_state(input_tensor, past_inputs, window - 1)
+            gate_values = C.sequence.slice(dense(Cx.sequence.window_causal(y, window, slide=1)), window - 1, 0)
+            gate_values = C.to_sequence_like(C.sequence.unpack(gate_values, 0, no_mask_output=True), input_tensor)
+            new_state = (new_past_inputs, )
+
+        z, f, o = gates(gate_values)
+
+        if parallel_scan:
+            c = _parallel_f_pool(z, f, max_seq_len, initial_state=cell)
+        else:
+            c = C.layers.RecurrenceFrom(f_pool)(cell, C.splice(z, f))
+
+        h = o * c  # o pool
+
+        outputs = (h, c) if return_full_state else (h, )
+        return outputs + new_state + (C.sequence.last(c), )
+
+    if streaming and window > 1:
+        @C.BlockFunction('QRNN', name)
+        def streaming_model(input_tensor, past_inputs, cell):
+            return stream(input_tensor, cell, past_inputs)
+
+        return streaming_model
+
+    if streaming:
+        @C.BlockFunction('QRNN', name)
+        def streaming_model(input_tensor, cell):
+            return stream(input_tensor, cell)
+
+        return streaming_model
+
     return model
 
 
-def SinusoidalPositionalEmbedding(dim, min_timescale=1.0, max_timescale=1.0e4, name=''):
+def QRNNStack(num_layers: int, hidden_dim: int, window: int = 1, bidirectional: bool = True, activation=C.tanh,
+              max_seq_len: int = 2 ** 16, name=''):
+    """
+    Stack of (bidirectional) Quasi-Recurrent Neural Network layers
+
+    Every layer computes the gates of both directions and all `window` taps with a single fused projection
+    of the layer input. The taps are shifted into place afterwards (into the past for the forward direction and
+    into the future for the backward direction), so there is no windowed copy of the input. f-pooling of both
+    directions runs in a single log-depth parallel scan (see `QRNN` with `parallel_scan=True`).
+
+    The output of a bidirectional layer is the concatenation of the forward and backward hidden states.
+
+    Example:
+        input_tensor = C.sequence.input_variable(input_dim)
+
+        hidden = QRNNStack(num_layers=4, hidden_dim=hidden_dim)(input_tensor)
+        assert hidden.shape == (2 * hidden_dim, )
+
+    Arguments:
+        num_layers (int): number of QRNN layers in the stack
+        hidden_dim (int): size of hidden dim of h, c and o of each direction
+        window (int): size of the convolutional window, i.e. how many previous (next for the backward direction)
+          tokens to look at when computing the gate values. Defaults 1.
+        bidirectional (bool): if True, every layer runs a forward and a backward QRNN. Defaults True.
+        activation: cell activation function
+        max_seq_len (int): upper bound on the sequence length. Determines the number of scan steps (log2(max_seq_len)),
+          each linear in the actual sequence length.
+        name: name of function instance in network
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`
+
+    """
+    if num_layers < 1:
+        raise ValueError(f"num_layers must be at least 1 but got {num_layers}")
+
+    if window < 1:
+        raise ValueError(f"window must be at least 1 but got {window}")
+
+    num_directions = 2 if bidirectional else 1
+    dim = num_directions * hidden_dim
+    backward_dim = hidden_dim if bidirectional else 0
+
+    # weights of all taps, gates and directions of a layer in one projection: [window, (z, f, o), directions * hidden]
+    denses = [Dense(shape=(window, 3, dim), name=f'qrnn_dense_{i}') for i in range(num_layers)]
+
+    def tap(gate_values, k):
+        """ gate contribution of the k-th window tap, from k items in the past (future for backward direction) """
+        g = C.reshape(C.slice(gate_values, 0, k, k + 1), (3, dim))
+        if k == 0:
+            return g
+
+        forward = C.sequence.past_value(C.slice(g, -1, 0, hidden_dim), time_step=k)
+        if not bidirectional:
+            return forward
+
+        backward = C.sequence.future_value(C.slice(g, -1, hidden_dim, dim), time_step=k)
+        return C.splice(forward, backward, axis=-1)
+
+    def layer(dense, x):
+        gate_values = dense(x)
+        # gate_values: [#, *] [window, 3, dim]
+
+        g = tap(gate_values, 0)
+        for k in range(1, window):
+            g = g + tap(gate_values, k)
+        # g: [#, *] [3, dim]
+
+        z = activation(C.reshape(C.slice(g, 0, 0, 1), (dim, )))
+        f = C.sigmoid(C.reshape(C.slice(g, 0, 1, 2), (dim, )))
+        o = C.sigmoid(C.reshape(C.slice(g, 0, 2, 3), (dim, )))
+
+        c = _parallel_f_pool(z, f, max_seq_len, backward_dim=backward_dim)
+        return o * c
+
+    @C.BlockFunction('QRNNStack', name)
+    def model(x):
+        h = x
+        for dense in denses:
+            h = layer(dense, h)
+
+        return h
+
+    return model
+
+
+_SINUSOID_TABLES = {}  # (num_timescales, min_timescale, max_timescale) -> [positions, 2 * num_timescales]
+
+
+def _inv_timescales(num_timescales: int, min_timescale: float, max_timescale: float):
+    log_timescale_increment = (math.log(float(max_timescale) / float(min_timescale)) / (num_timescales - 1))
+    return min_timescale * np.exp(np.arange(num_timescales) * -log_timescale_increment)
+
+
+def _sinusoids(positions, inv_timescales):
+    """ [len(positions), 2 * num_timescales] table of sin and cos of position * inv_timescales """
+    scaled_time = np.asarray(positions, dtype=np.float64)[:, None] * inv_timescales
+    return np.concatenate([np.sin(scaled_time), np.cos(scaled_time)], axis=1).astype(np.float32)
+
+
+def _sinusoid_table(num_timescales: int, min_timescale: float, max_timescale: float, length: int):
+    """ sinusoids of the first `length` positions, cached across layers and grown (doubling) on demand """
+    key = (num_timescales, min_timescale, max_timescale)
+    table = _SINUSOID_TABLES.get(key)
+
+    if table is None or table.shape[0] < length:
+        size = length if table is None else max(length, 2 * table.shape[0])
+        inv_timescales = _inv_timescales(num_timescales, min_timescale, max_timescale)
+        table = _SINUSOID_TABLES[key] = _sinusoids(np.arange(size), inv_timescales)
+
+    return table[:length]
+
+
+def SinusoidalPositionalEmbedding(dim, min_timescale=1.0, max_timescale=1.0e4, table_size: int = None,
+                                  max_seq_len: int = 2 ** 16, name=''):
     """ Gets a bunch of sinusoids of different frequencies and add it to the input sequence
 
     Each channel of the input Tensor is incremented by a sinusoid of a different
@@ -420,6 +665,14 @@ def SinusoidalPositionalEmbedding(dim, min_timescale=1.0, max_timescale=1.0e4, n
 
     There are no learnable parameters in this embedding.
 
+    With `table_size`, sinusoids are looked up instead of computed. Rows are gathered from a precomputed
+    [table_size, dim] table. The numpy table is computed once per configuration and cached. Every layer still
+    holds its own constant. Positions beyond the table are decomposed into position = q * table_size + r. Their
+    sinusoids are then composed from row r and a second, coarse table of the rows q * table_size, using
+    sin(a + b) and cos(a + b). That costs two gathers and a few multiplications. Positions at or beyond
+    `max_seq_len` (rounded up to a multiple of `table_size`) fall back to the analytic sinusoids. The graph
+    evaluates that fallback for every position and selects it per position, so sin and cos are still computed.
+
     Example:
         import cntk as C
         import cntkx as Cx
@@ -433,6 +686,11 @@ def SinusoidalPositionalEmbedding(dim, min_timescale=1.0, max_timescale=1.0e4, n
         dim (int): dimension of embedding (typically must be the same as the incoming tensor to be embedded)
         min_timescale (float): geometric sequence of timescales starting with min_timescale
         max_timescale (float): geometric sequence of timescales ending with max_timescale
+        table_size (int): number of positions in the precomputed sinusoid table. If None (default),
+          sinusoids are computed analytically for every token.
+        max_seq_len (int): expected upper bound on the sequence length, only used with `table_size`.
+          Determines the size of the coarse table used for positions beyond `table_size`. Longer sequences
+          are still embedded correctly, with analytic sinusoids beyond the coarse table.
         name (str): a name for this layer.
 
     Returns:
@@ -440,19 +698,43 @@ def SinusoidalPositionalEmbedding(dim, min_timescale=1.0, max_timescale=1.0e4, n
 
     """
 
-    @C.BlockFunction('SinusoidalPositionalEmbedding', name)
-    def embedding(x):
-        num_timescales = dim // 2
-        log_timescale_increment = (math.log(float(max_timescale) / float(min_timescale)) / (num_timescales - 1))
-        inv_timescales = C.constant(min_timescale * np.exp(np.arange(num_timescales) * -log_timescale_increment),
-                                    dtype=np.float32)
+    num_timescales = dim // 2
+    inv_timescales = _inv_timescales(num_timescales, min_timescale, max_timescale)
 
-        pos = Cx.sequence.position(x)  # pos: [#, *] [1, ]
+    if table_size:
+        num_coarse = math.ceil(max_seq_len / table_size)
+        fine = C.constant(_sinusoid_table(num_timescales, min_timescale, max_timescale, table_size))
+        coarse = C.constant(_sinusoids(np.arange(num_coarse) * table_size, inv_timescales))
+
+    inv_timescales = C.constant(inv_timescales, dtype=np.float32)
+
+    def table_lookup(pos):
+        q = C.floor((pos + 0.5) / table_size)  # pos: [#, *] [1, ]
+        r = pos - q * table_size
+
+        fine_rows = C.reshape(C.gather(fine, r), (2 * num_timescales, ))
+        # q is clamped to stay inside the coarse table, positions beyond it are replaced by the analytic path
+        coarse_rows = C.reshape(C.gather(coarse, C.element_min(q, num_coarse - 1)), (2 * num_timescales, ))
+        # fine_rows, coarse_rows: [#, *] [2 * num_timescales, ]
+
+        sin_r, cos_r = C.slice(fine_rows, 0, 0, num_timescales), C.slice(fine_rows, 0, num_timescales, 0)
+        sin_q, cos_q = C.slice(coarse_rows, 0, 0, num_timescales), C.slice(coarse_rows, 0, num_timescales, 0)
+
+        # for positions within the table, q == 0 and so (sin_q, cos_q) == (0, 1)
+        return C.splice(sin_r * cos_q + cos_r * sin_q, cos_r * cos_q - sin_r * sin_q)
+
+    def analytic(pos):
         scaled_time = pos * inv_timescales  # scaled_time: [#, *] [num_timescales,]
+        return C.splice(C.sin(scaled_time), C.cos(scaled_time))
 
-        s = C.sin(scaled_time)
-        c = C.cos(scaled_time)
-        signal = C.splice(s, c)
+    @C.BlockFunction('SinusoidalPositionalEmbedding', name)
+    def embedding(x):
+        pos = Cx.sequence.position(x)  # pos: [#, *] [1, ]
+        if table_size:
+            beyond_table = C.greater_equal(pos, num_coarse * table_size)
+            signal = C.element_select(beyond_table, analytic(pos), table_lookup(pos))
+        else:
+            signal = analytic(pos)
 
         # last dim gets a 0 value if input_dim is odd
         if dim % 2 != 0:
@@ -983,6 +1265,13 @@ def SpatialPyramidPooling(bins: tuple, name=''):
     return spp
 
 
+# A window of shifted copies stores about two full size tensors per window item (the copies and their splice).
+# sliding_max stores about 8 * log2(width) + 15, which is fewer from a width of about 32 onwards. sliding_mean runs
+# a prefix sum of log2(max_seq_len) shift and add steps plus a few steps worth of edge handling.
+_SLIDING_MAX_MIN_WIDTH = 32
+_SLIDING_MEAN_EDGE_STEPS = 4
+
+
 def SequentialMaxPooling(filter_shape,  # shape of receptive field, e.g. (3,3). filter_shape[0] is for sequence axis.
                          strides=1,     # strides[0] is for sequence axis.
                          pad=default_override_or(True),   # pad[0] is for sequence axis.
@@ -1048,23 +1337,25 @@ def SequentialMaxPooling(filter_shape,  # shape of receptive field, e.g. (3,3).
     def inner(x):
         if pad[0]:  # sequential axis
             # when kernel is even, padding will be asymmetric in left and right
-            right_pad = int((filter_shape[0] - 1) / 2) if filter_shape[0] % 2 else int(filter_shape[0] / 2)
-            left_pad = right_pad if filter_shape[0] % 2 else right_pad - 1
-
-            past = [C.sequence.past_value(x, time_step=i + 1) for i in range(left_pad)]
-            future = [C.sequence.future_value(x, time_step=i + 1) for i in range(right_pad)]
-
-            past_now_future = past + [x] + future
-
+            after = int((filter_shape[0] - 1) / 2) if filter_shape[0] % 2 else int(filter_shape[0] / 2)
+            before = after if filter_shape[0] % 2 else after - 1
         else:
+            before, after = 0, filter_shape[0] - 1
 
-            future = [C.sequence.future_value(x, time_step=i + 1) for i in range(filter_shape[1] - 1)]
-            past_now_future = [x] + future
+        if filter_shape[0] >= _SLIDING_MAX_MIN_WIDTH:
+            # cost of sliding window reduction grows with log2 of the window width only
+            pooled = Cx.sequence.sliding_max(x, before, after, padding_value=0)
+            pooled = Cx.sequence.stride(pooled, strides[0]) if strides[0] > 1 else pooled
+            return static_pooler(pooled)
+
+        past = [C.sequence.past_value(x, time_step=i + 1) for i in range(before)]
+        future = [C.sequence.future_value(x, time_step=i + 1) for i in range(after)]
+        past_now_future = past + [x] + future
 
         windows = C.splice(*past_now_future, axis=C.Axis.new_leading_axis())
         # windows: [#, *] [concat, channel, static_axes...]
 
-        selected_windows = Cx.sequence.stride(windows, strides[0])
+        selected_windows = Cx.sequence.stride(windows, strides[0]) if strides[0] > 1 else windows
         # selected_windows: [#, **] [concat, channel, static_axes...]
         # assert windows.shape == selected_windows.shape
 
@@ -1084,6 +1375,7 @@ def SequentialMaxPooling(filter_shape,  # shape of receptive field, e.g. (3,3).
 def SequentialAveragePooling(filter_shape,  # shape of receptive field, e.g. (3,3) filter_shape[0] is for sequence axis
                              strides=1,  # strides[0] is for sequence axis.
                              pad=default_override_or(True),  # pad[0] is for sequence axis.
+                             max_seq_len: int = 2 ** 16,
                              name=''):
     """ Layer factory function to create a average-pooling layer that works with sequences
 
@@ -1126,6 +1418,8 @@ def SequentialAveragePooling(filter_shape,  # shape of receptive field, e.g. (3,
           area of input, that is, no value outside the area is used. If ``pad=True`` on the other hand,
           pooling will be applied to all input positions, and positions outside the valid region will be considered containing zero.
           Use a `tuple` to specify a per-axis value.
+        max_seq_len (int): upper bound on the sequence length. Windows wider than log2(max_seq_len) + 4 are
+          averaged from a prefix sum of log2(max_seq_len) steps instead of one shifted copy per window item.
         name (str, defaults to ''): the name of the function instance in the network
 
 
@@ -1161,23 +1455,25 @@ def SequentialAveragePooling(filter_shape,  # shape of receptive field, e.g. (3,
     def inner(x):
         if pad[0]:  # sequential axis
             # when kernel is even, padding will be asymmetric in left and right
-            right_pad = int((filter_shape[0] - 1) / 2) if filter_shape[0] % 2 else int(filter_shape[0] / 2)
-            left_pad = right_pad if filter_shape[0] % 2 else right_pad - 1
-
-            past = [C.sequence.past_value(x, time_step=i + 1) for i in range(left_pad)]
-            future = [C.sequence.future_value(x, time_step=i + 1) for i in range(right_pad)]
-
-            past_now_future = past + [x] + future
-
+            after = int((filter_shape[0] - 1) / 2) if filter_shape[0] % 2 else int(filter_shape[0] / 2)
+            before = after if filter_shape[0] % 2 else after - 1
         else:
+            before, after = 0, filter_shape[0] - 1
 
-            future = [C.sequence.future_value(x, time_step=i + 1) for i in range(filter_shape[1] - 1)]
-            past_now_future = [x] + future
+        if filter_shape[0] > (max_seq_len - 1).bit_length() + _SLIDING_MEAN_EDGE_STEPS:
+            # cost of sliding window reduction does not grow with the window width
+            pooled = Cx.sequence.sliding_mean(x, before, after, include_padding=True, max_seq_len=max_seq_len)
+            pooled = Cx.sequence.stride(pooled, strides[0]) if strides[0] > 1 else pooled
+            return static_pooler(pooled)
+
+        past = [C.sequence.past_value(x, time_step=i + 1) for i in range(before)]
+        future = [C.sequence.future_value(x, time_step=i + 1) for i in range(after)]
+        past_now_future = past + [x] + future
 
         windows = C.splice(*past_now_future, axis=C.Axis.new_leading_axis())
         # windows: [#, *] [concat, channel, static_axes...]
 
-        selected_windows = Cx.sequence.stride(windows, strides[0])
+        selected_windows = Cx.sequence.stride(windows, strides[0]) if strides[0] > 1 else windows
         # selected_windows: [#, **] [concat, channel, static_axes...]
         # assert windows.shape == selected_windows.shape
 
@@ -1311,13 +1607,12 @@ def PositionalEmbedding(hidden_dim: int, max_seq_length: int, init=default_overr
         Positional embedding vector of shape (`hidden_dim`, )
     """
 
-    position_embeddings = Embedding(shape=hidden_dim, init=init, weights=weights, name='PE')
+    position_embeddings = Embedding(shape=hidden_dim, init=init, weights=weights, index_input=True,
+                                    input_dim=max_seq_length, name='PE')
 
     @C.BlockFunction('PositionalEmbedding', name)
     def inner(x):
-        position_index = C.squeeze(Cx.sequence.position(x))
-        pos = C.one_hot(position_index, max_seq_length, sparse_output=True)
-        embedded = position_embeddings(pos)
+        embedded = position_embeddings(Cx.sequence.position(x))
         return embedded
 
     return inner
@@ -1327,7 +1622,8 @@ def BertEmbeddings(hidden_dim: int, max_seq_length: int, dropout_rate: float = N
                    word_embed_init=default_override_or(C.glorot_uniform()), word_embed_weights=None,
                    position_embed_init=default_override_or(C.glorot_uniform()), position_embed_weights=None,
                    token_type_embed_init=default_override_or(C.glorot_uniform()), token_type_embed_weights=None,
-                   layer_norm_init_scale=1, layer_norm_init_bias=0, name=''):
+                   layer_norm_init_scale=1, layer_norm_init_bias=0, index_input: bool = False,
+                   vocab_size: int = None, type_vocab_size: int = 2, name=''):
     """ Construct the embeddings from word, position and token_type embeddings that is used in BERT.
     Paper can be found at https://arxiv.org/abs/1810.04805 (BERT: Pre-training of Deep Bidirectional
     Transformers for Language Understanding)
@@ -1338,15 +1634,21 @@ def BertEmbeddings(hidden_dim: int, max_seq_length: int, dropout_rate: float = N
         dropout_rate (float): probability of dropout
         layer_norm_init_scale (float): initial value for the ``scale`` parameter
         layer_norm_init_bias (float): initial value for the ``bias`` parameter
+        index_input (bool): whether text and token type inputs are integer ids of shape (1, ) instead of one-hot vectors
+        vocab_size (int): number of words, required with `index_input` unless `word_embed_init` is a numpy array
+        type_vocab_size (int): number of token types, only used with `index_input`
 
     Returns:
         :class:`~cntk.ops.functions.Function`:
         Embedding vector of shape (`hidden_dim`, )
 
     """
-    word_embeddings = Embedding(shape=hidden_dim, init=word_embed_init, weights=word_embed_weights, name='word_embeddings')
+    word_embeddings = Embedding(shape=hidden_dim, init=word_embed_init, weights=word_embed_weights,
+                                index_input=index_input, input_dim=vocab_size, name='word_embeddings')
     position_embeddings = PositionalEmbedding(hidden_dim=hidden_dim, max_seq_length=max_seq_length, init=position_embed_init, weights=position_embed_weights, name='position_embeddings')
-    token_type_embeddings = Embedding(shape=hidden_dim, init=token_type_embed_init, weights=token_type_embed_weights, name='token_type_embeddings')  # aka 'segment embedding'
+    token_type_embeddings = Embedding(shape=hidden_dim, init=token_type_embed_init, weights=token_type_embed_weights,
+                                      index_input=index_input, input_dim=type_vocab_size if index_input else None,
+                                      name='token_type_embeddings')  # aka 'segment embedding'
 
     layer_norm = LayerNormalization(initial_scale=layer_norm_init_scale, initial_bias=layer_norm_init_bias,
                                     name='LayerNorm')
@@ -1367,7 +1669,7 @@ def BertEmbeddings(hidden_dim: int, max_seq_length: int, dropout_rate: float = N
     return inner
 
 
-def PreTrainedBertEmbeddings(tf_bert_model_filepath: str, dropout_rate: float = None, name=''):
+def PreTrainedBertEmbeddings(tf_bert_model_filepath: str, dropout_rate: float = None, index_input: bool = False, name=''):
     """ Use pre-trained tensorflow bert model to initialise the model
 
     Currently it is tested to work with:
@@ -1379,6 +1681,7 @@ def PreTrainedBertEmbeddings(tf_bert_model_filepath: str, dropout_rate: float =
         tf_bert_model_filepath (str): file path to the tensorflow model
         dropout_rate (float): probability of dropping out an element
         learnable (bool): True if training of embeddings is desired. Defaults to False.
+        index_input (bool): whether text and token type inputs are integer ids of shape (1, ) instead of one-hot vectors
 
     Returns:
         :class:`~cntk.ops.functions.Function`:
@@ -1416,6 +1719,7 @@ def PreTrainedBertEmbeddings(tf_bert_model_filepath: str, dropout_rate: float =
                                                token_type_embed_init=token_type_embed_variables[-1],
                                                layer_norm_init_scale=layernorm_gamma_embed_variables[-1],
                                                layer_norm_init_bias=layernorm_beta_embed_variables[-1],
+                                               index_input=index_input,
                                                name=name)
 
     return pretrained_bert_embedding
@@ -1498,8 +1802,40 @@ def PositionwiseFeedForward(model_dim: int, intermediate_dim: int, dropout_rate:
     return inner
 
 
+def _fsmn_memory(x, a, num_past_context: int, num_future_context: int, shape):
+    """ FSMN memory block, sum of a_k * x_(t+k) for k in [-num_past_context, num_future_context], computed as a
+    depthwise 1-D convolution along the (unpacked) sequence axis, so activation memory does not grow with context.
+
+    Rows of `a` are ordered as (current, past 1 .. num_past_context, future 1 .. num_future_context).
+    The kernel is centred with the wider context on both sides, so the convolution zero pads the sequence itself
+    and unused taps are zero.
+    """
+    dim = int(np.prod(shape))
+    width = num_past_context + 1 + num_future_context
+    half_width = max(num_past_context, num_future_context)
+
+    # reorder taps into kernel order (oldest to newest) and lay them out as one filter per channel.
+    # index `width` is an appended zero row for the taps beyond the context on the narrower side.
+    order = [k if k <= num_past_context else width for k in range(half_width, 0, -1)] + [0]
+    order += [num_past_context + k if k <= num_future_context else width for k in range(1, half_width + 1)]
+    taps = C.reshape(a, (width, dim))
+    taps = C.splice(taps, C.zeros_like(C.slice(taps, 0, 0, 1)), axis=0)
+    kernel = C.gather(taps, C.constant(np.array(order, dtype=np.float32)))
+    kernel = C.reshape(C.swapaxes(kernel, 0, 1), (dim, 1, 2 * half_width + 1))
+    # kernel: [dim, 1, 2 * half_width + 1]
+
+    u = C.sequence.unpack(C.reshape(x, (dim, )), padding_value=0, no_mask_output=True)
+    # u: [#] [*, dim], sequence padding is zero and so doubles as future context beyond the end
+
+    memory = C.convolution(kernel, C.swapaxes(u, 0, 1), auto_padding=[False, True], groups=dim)
+    # memory: [#] [dim, *]
+
+    memory = C.to_sequence_like(C.swapaxes(memory, 0, 1), x)
+    return C.reshape(memory, shape)
+
+
 def vFSMN(shape, activation, num_past_context, num_future_context, input_rank=None, init=C.glorot_normal(), bias=True,
-          init_bias=0, name=''):
+          init_bias=0, input_dim=None, name=''):
     """ Bi-directional vectorised Feedforward sequential memory network
 
     Implementation of feedforward sequential memory networks (FSMN), to model
@@ -1529,6 +1865,12 @@ def vFSMN(shape, activation, num_past_context, num_future_context, input_rank=No
 
         assert b.shape == (120,)
 
+        # memory block as a depthwise convolution, needs the input dimension
+        a = C.sequence.input_variable(10)
+        b = vFSMN(120, C.relu, num_past_context=30, num_future_context=30, input_dim=10)(a)
+
+        assert b.shape == (120,)
+
     Arguments:
         shape (`int` or `tuple` of `ints`): vector or tensor dimension of the output of this layer
         activation (:class:`~cntk.ops.functions.Function`, defaults to identity): optional function to apply at the end, e.g. `relu`
@@ -1538,12 +1880,18 @@ def vFSMN(shape, activation, num_past_context, num_future_context, input_rank=No
         input_rank (int, defaults to `None`): number of inferred axes to add to W (`map_rank` must not be given)
         bias (bool, optional, defaults to `True`): the layer will have no bias if `False` is passed here
         init_bias (scalar or NumPy array or :mod:`cntk.initializer`, defaults to 0): initial value of weights `b`
+        input_dim (`int` or `tuple` of `ints`, defaults to `None`): shape of the input. If given, the memory block is
+          computed as a depthwise convolution along the sequence axis, so activation memory does not grow with context.
+          Otherwise parameter shapes are inferred and the memory block splices one shifted copy of the input per tap.
         name (str, defaults to ''): the name of the function instance in the network
 
     Returns:
         cntk.ops.functions.Function:
         A function that accepts one argument and applies the operation to it
     """
+    if num_past_context < 0 or num_future_context < 0:
+        raise ValueError(f"context must not be negative but got {num_past_context} and {num_future_context}")
+
     output_shape = _as_tuple(shape)
     output_rank = len(output_shape)   # support outputs with tensor layouts
 
@@ -1556,26 +1904,35 @@ def vFSMN(shape, activation, num_past_context, num_future_context, input_rank=No
     else:
         init_weights = _initializer_for(init, Record(output_rank=output_rank))
 
-    # If input_rank not given then pass a single _INFERRED; map_rank if given will determine the input_rank.
-    # The dimension inference may still create multiple axes.
-    input_shape = _INFERRED * (input_rank if input_rank is not None else 1)
+    width = num_past_context + num_future_context + 1
+
+    if input_dim is not None:
+        input_shape = _as_tuple(input_dim)
+        a = C.Parameter(shape=(width, ) + input_shape, name='a')
+    else:
+        # If input_rank not given then pass a single _INFERRED; map_rank if given will determine the input_rank.
+        input_shape = _INFERRED * (input_rank if input_rank is not None else 1)
+        a = C.Parameter(shape=_INFERRED + input_shape, name='a')  # first axis is inferred as width
 
     W = C.Parameter(shape=input_shape + output_shape, init=init_weights, name='W')
     H = C.Parameter(shape=input_shape + output_shape, init=init_weights, name='H')
-    a = C.Parameter(shape=input_shape + _INFERRED, name='a')  # shape = (-1, -1)
-    b = C.Parameter(shape=output_shape, init=init_bias,    name='b') if bias else None
+    b = C.Parameter(shape=output_shape, init=init_bias, name='b') if bias else None
 
     @C.BlockFunction('vFSMN', name)
     def inner(x):
-        past = [C.sequence.delay(x, time_step=i + 1) for i in range(num_past_context)]
-        future = [C.sequence.delay(x, time_step=i + 1) for i in range(num_future_context)]
+        if input_dim is not None:
+            hidden_memory = _fsmn_memory(x, a, num_past_context, num_future_context, input_shape)
+
+            # input and memory share a single projection
+            r = C.times(C.splice(x, hidden_memory, axis=-1), C.splice(W, H, axis=len(W.shape) - output_rank - 1))
+        else:
+            past = [C.sequence.past_value(x, time_step=k + 1) for k in range(num_past_context)]
+            future = [C.sequence.future_value(x, time_step=k + 1) for k in range(num_future_context)]
 
-        # compute memory
-        hidden_memory = C.splice(x, *past, *future, axis=C.Axis.new_leading_axis())
-        hidden_memory = a * hidden_memory
-        hidden_memory = C.squeeze(C.reduce_sum(hidden_memory, axis=0), axes=0)  # BUGBUG: keepdim must be True
+            taps = C.splice(x, *past, *future, axis=C.Axis.new_leading_axis()) if width > 1 else C.expand_dims(x, 0)
+            hidden_memory = C.squeeze(C.reduce_sum(a * taps, axis=0), axes=0)  # BUGBUG: keepdim must be True
 
-        r = C.times(x, W) + C.times(hidden_memory, H)  # TODO: potential speed up by splice into one big matrix to times
+            r = C.times(x, W) + C.times(hidden_memory, H)
 
         if bias:
             r = r + b
@@ -1597,6 +1954,8 @@ def cFSMN(shape, proj_dim, activation, num_past_context, num_future_context, inp
     still significantly outperforming the popular bi-direction LSTMs for both
     frame-level cross-entropy (CE) criterion based training and MMI based sequence training.
 
+    The memory block is computed as a depthwise convolution along the sequence axis of the projection.
+
     For more details please refer to "Compact Feedforward Sequential Memory Networks for
     Large VocabularyContinuous Speech Recognition" by Zhang, et al.
 
@@ -1622,6 +1981,9 @@ def cFSMN(shape, proj_dim, activation, num_past_context, num_future_context, inp
         cntk.ops.functions.Function:
         A function that accepts one argument and applies the operation to it
     """
+    if num_past_context < 0 or num_future_context < 0:
+        raise ValueError(f"context must not be negative but got {num_past_context} and {num_future_context}")
+
     output_shape = _as_tuple(shape)
     output_rank = len(output_shape)   # support outputs with tensor layouts
 
@@ -1640,19 +2002,13 @@ def cFSMN(shape, proj_dim, activation, num_past_context, num_future_context, inp
 
     linear = Dense(shape=proj_dim, init=init, bias=bias, init_bias=init_bias, input_rank=input_rank, name='projection')
     H = C.Parameter(shape=input_shape + output_shape, init=init_weights, name='H')
-    a = C.Parameter(shape=input_shape + _INFERRED, name='a')  # shape = (-1, -1)  # TODO: input_shape input_rank
+    a = C.Parameter(shape=(num_past_context + num_future_context + 1, proj_dim), name='a')
     b = C.Parameter(shape=output_shape, init=init_bias, name='bb') if bias else None
 
     @C.BlockFunction('cFSMN', name)
     def inner(x):
         p = linear(x)
-        past = [C.sequence.delay(p, time_step=i + 1) for i in range(num_past_context)]
-        future = [C.sequence.delay(p, time_step=i + 1) for i in range(num_future_context)]
-
-        # compute memory
-        hidden_memory = C.splice(p, *past, *future, axis=C.Axis.new_leading_axis())
-        hidden_memory = a * hidden_memory
-        hidden_memory = p + C.squeeze(C.reduce_sum(hidden_memory, axis=0), axes=0)  # BUGBUG: keepdim must be True
+        hidden_memory = p + _fsmn_memory(p, a, num_past_context, num_future_context, (proj_dim, ))
 
         r = C.times(hidden_memory, H)
 
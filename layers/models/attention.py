@@ -102,7 +102,8 @@ def LinearAttentionModel(hidden_dim: int, model_dim: int,
     return model
 
 
-def ScaledDotProductAttention(obey_sequence_order: bool = None, max_seq_len: int = None, name=''):
+def ScaledDotProductAttention(obey_sequence_order: bool = None, max_seq_len: int = None, block_size: int = None,
+                              name=''):
     """
     Scaled dot-product attention implementation of "Attention is all you need", https://arxiv.org/abs/1706.03762
 
@@ -127,7 +128,13 @@ def ScaledDotProductAttention(obey_sequence_order: bool = None, max_seq_len: int
 
     Arguments:
         obey_sequence_order: do not let attention peek into future values
-        max_seq_len: max sequence length possible, used to ensure that sequence order is obeyed
+        max_seq_len: deprecated and unused. Causal mask is computed from sequence positions
+        block_size (int): if set, keys are processed in blocks of `block_size` with online softmax
+          (see `cntkx.tiled_scaled_dot_product_attention`). This does not reduce memory.
+
+    The returned function takes an optional `segment_ids` after value. For sequences packed with
+    `cntkx.misc.pack_sequences`, queries then only attend to keys of the same segment. It is either a
+    sequence tensor of shape (1, ) shared by query and key, or a tuple of (query_segment_ids, key_segment_ids).
 
     Returns:
         :class:`~cntk.ops.functions.Function`:
@@ -135,8 +142,12 @@ def ScaledDotProductAttention(obey_sequence_order: bool = None, max_seq_len: int
 
     """
 
-    def attention(query, key, value):
-        return Cx.scaled_dot_product_attention(query, key, value, obey_sequence_order, max_seq_len, name)
+    def attention(query, key, value, segment_ids=None):
+        if block_size:
+            return Cx.tiled_scaled_dot_product_attention(query, key, value, block_size, obey_sequence_order,
+                                                         segment_ids, name)
+
+        return Cx.scaled_dot_product_attention(query, key, value, obey_sequence_order, max_seq_len, segment_ids, name)
 
     return attention
 
@@ -146,7 +157,7 @@ def MultiHeadAttention(num_heads, model_dim, obey_sequence_order: bool = None, m
                        query_init=default_override_or(C.glorot_uniform()), query_init_bias=default_override_or(0),
                        value_init=default_override_or(C.glorot_uniform()), value_init_bias=default_override_or(0),
                        init=default_override_or(C.glorot_uniform()), init_bias=default_override_or(0),
-                       name=''):
+                       batch_heads: bool = False, block_size: int = None, segmented: bool = False, name=''):
     """ Multi-head attention as described in "Attention is all you need", https://arxiv.org/abs/1706.03762
 
     Example:
@@ -159,7 +170,7 @@ def MultiHeadAttention(num_heads, model_dim, obey_sequence_order: bool = None, m
         num_heads (int): number of attention heads
         model_dim (int): number of hidden dim in final output of multi-head attention
         obey_sequence_order: do not let attention peek into future values
-        max_seq_len: max sequence length possible, used to ensure that sequence order is obeyed
+        max_seq_len: deprecated and unused. Causal mask is computed from sequence positions
         key_init (scalar or NumPy array or :mod:`cntk.initializer`, defaults to :func:`~cntk.initializer.glorot_uniform` ): initial value of weights `W`
         key_init_bias (scalar or NumPy array or :mod:`cntk.initializer`, defaults to 0): initial value of weights `b`
         query_init (scalar or NumPy array or :mod:`cntk.initializer`, defaults to :func:`~cntk.initializer.glorot_uniform` ): initial value of weights `W`
@@ -168,6 +179,13 @@ def MultiHeadAttention(num_heads, model_dim, obey_sequence_order: bool = None, m
         value_init_bias (scalar or NumPy array or :mod:`cntk.initializer`, defaults to 0): initial value of weights `b`
         init (scalar or NumPy array or :mod:`cntk.initializer`, defaults to :func:`~cntk.initializer.glorot_uniform` ): initial value of weights `W`
         init_bias (scalar or NumPy array or :mod:`cntk.initializer`, defaults to 0): initial value of weights `b`
+        batch_heads (bool): compute all heads at once with a single batched matmul and softmax instead of one
+          attention subgraph per head. Cannot be used inside a recurrence loop that steps over the query sequence.
+        block_size (int): if set, every head processes keys in blocks of `block_size` with online softmax
+          (see `cntkx.tiled_scaled_dot_product_attention`). This does not reduce memory. Cannot be used with `batch_heads`.
+        segmented (bool): if True, the returned function takes `query_segment_ids` and `key_segment_ids` after value.
+          For sequences packed with `cntkx.misc.pack_sequences`, queries then only attend to keys of the same segment.
+          For self-attention, pass the same segment ids twice.
 
     Returns:
         :class:`~cntk.ops.functions.Function`:
@@ -175,6 +193,9 @@ def MultiHeadAttention(num_heads, model_dim, obey_sequence_order: bool = None, m
     """
     assert model_dim % num_heads == 0, "Model dimension must be divisible by number of heads"
 
+    if batch_heads and block_size:
+        raise ValueError("batch_heads and block_size cannot be used together")
+
     head_dim = int(model_dim / num_heads)
 
     query_linear = Dense(model_dim, init=query_init, init_bias=query_init_bias)
@@ -182,25 +203,39 @@ def MultiHeadAttention(num_heads, model_dim, obey_sequence_order: bool = None, m
     value_linear = Dense(model_dim, init=value_init, init_bias=value_init_bias)
     multihead_liner = Dense(model_dim, init=init, init_bias=init_bias)
 
-    scaled_dot_product_attention = ScaledDotProductAttention(obey_sequence_order, max_seq_len)
+    scaled_dot_product_attention = ScaledDotProductAttention(obey_sequence_order, max_seq_len, block_size)
 
-    @C.BlockFunction('MultiHeadAttention', name)
-    def inner(query, key, value):
+    def attend(query, key, value, segment_ids=None):
         mixed_queries = query_linear(query)  # [#, *] {model_dim,]
         mixed_keys = key_linear(key)  # [#, *] {model_dim,]
         mixed_values = value_linear(value)  # [#, *] {model_dim,]
 
-        # TODO: re-implement `ScaledDotProductAttention` when cntk has BatchMatMul so there's no need to slice here
+        if batch_heads:
+            attended = Cx.multi_head_scaled_dot_product_attention(mixed_queries, mixed_keys, mixed_values, num_heads,
+                                                                   obey_sequence_order, max_seq_len, segment_ids)
+            return multihead_liner(attended)
+
         queries = [C.slice(mixed_queries, 0, i * head_dim, (i + 1) * head_dim) for i in range(num_heads)]
         keys = [C.slice(mixed_keys, 0, i * head_dim, (i + 1) * head_dim) for i in range(num_heads)]
         values = [C.slice(mixed_values, 0, i * head_dim, (i + 1) * head_dim) for i in range(num_heads)]
 
         # list of num_heads heads with shape (-3, head_dim) each
-        attention_outputs = [scaled_dot_product_attention(q, k, v) for q, k, v in zip(queries, keys, values)]
+        attention_outputs = [scaled_dot_product_attention(q, k, v, segment_ids) for q, k, v in zip(queries, keys, values)]
 
         result = multihead_liner(C.splice(*attention_outputs))
         return result
 
+    if segmented:
+        @C.BlockFunction('MultiHeadAttention', name)
+        def segmented_inner(query, key, value, query_segment_ids, key_segment_ids):
+            return attend(query, key, value, (query_segment_ids, key_segment_ids))
+
+        return _inject_name(segmented_inner, name)
+
+    @C.BlockFunction('MultiHeadAttention', name)
+    def inner(query, key, value):
+        return attend(query, key, value)
+
     return _inject_name(inner, name)
 
 
@@ -209,7 +244,7 @@ def MultiHeadAttentionBlock(num_heads, model_dim, obey_sequence_order: bool = No
                             query_init=default_override_or(C.glorot_uniform()), query_init_bias=default_override_or(0),
                             value_init=default_override_or(C.glorot_uniform()), value_init_bias=default_override_or(0),
                             init=default_override_or(C.glorot_uniform()), init_bias=default_override_or(0),
-                            initial_scale=1, initial_bias=0, name=''):
+                            initial_scale=1, initial_bias=0, batch_heads: bool = False, name=''):
     """ Multi head attention block as described in "Attention is all you need", https://arxiv.org/abs/1706.03762
 
     Multi-head attention block comes with a residual connection and a layer norm.
@@ -224,7 +259,7 @@ def MultiHeadAttentionBlock(num_heads, model_dim, obey_sequence_order: bool = No
         num_heads (int): number of attention heads
         model_dim (int): number of hidden dim in final output of multi-head attention
         obey_sequence_order: do not let attention peek into future values
-        max_seq_len: max sequence length possible, used to ensure that sequence order is obeyed
+        max_seq_len: deprecated and unused. Causal mask is computed from sequence positions
         key_init (scalar or NumPy array or :mod:`cntk.initializer`, defaults to :func:`~cntk.initializer.glorot_uniform` ): initial value of weights `W`
         key_init_bias (scalar or NumPy array or :mod:`cntk.initializer`, defaults to 0): initial value of weights `b`
         query_init (scalar or NumPy array or :mod:`cntk.initializer`, defaults to :func:`~cntk.initializer.glorot_uniform` ): initial value of weights `W`
@@ -235,6 +270,7 @@ def MultiHeadAttentionBlock(num_heads, model_dim, obey_sequence_order: bool = No
         init_bias (scalar or NumPy array or :mod:`cntk.initializer`, defaults to 0): initial value of weights `b`
         initial_scale (float, default 1): initial value for the ``scale`` parameter aka gamma
         initial_bias (float, default 0): initial value for the ``bias`` parameter aka beta
+        batch_heads (bool): compute all heads at once with a single batched matmul and softmax
 
     Returns:
         :class:`~cntk.ops.functions.Function`:
@@ -244,7 +280,8 @@ def MultiHeadAttentionBlock(num_heads, model_dim, obey_sequence_order: bool = No
                                          key_init=key_init, key_init_bias=key_init_bias,
                                          query_init=query_init, query_init_bias=query_init_bias,
                                          value_init=value_init, value_init_bias=value_init_bias,
-                                         init=init, init_bias=init_bias, name='MultiheadAttention')
+                                         init=init, init_bias=init_bias, batch_heads=batch_heads,
+                                         name='MultiheadAttention')
 
     layernorm = LayerNormalization(initial_scale=initial_scale, initial_bias=initial_bias, name='LayerNorm')
 
@@ -267,7 +304,7 @@ def TransformerEncoderBlock(num_heads: int, model_dim: int, intermediate_dim: in
                             mha_initial_scale=1, mha_initial_bias=0,
                             intermediate_init=default_override_or(C.glorot_uniform()), intermediate_init_bias=default_override_or(0),
                             init=default_override_or(C.glorot_uniform()), init_bias=default_override_or(0),
-                            initial_scale=1, initial_bias=0, name=''):
+                            initial_scale=1, initial_bias=0, batch_heads: bool = False, name=''):
     """ Encoder block of transformer as described in "Attention is all you need", https://arxiv.org/abs/1706.03762
 
     Consist of 1 multi head attention followed by a dense layer, residual connect and layer norm
@@ -278,7 +315,7 @@ def TransformerEncoderBlock(num_heads: int, model_dim: int, intermediate_dim: in
         intermediate_dim (int): hidden/ intermediate dimension within position-wise feed-forward layer
         dropout_rate (float): probability of dropping out an element in the position-wise feed-forward
         obey_sequence_order: do not let attention peek into future values
-        max_seq_len: max sequence length possible, used to ensure that sequence order is obeyed
+        max_seq_len: deprecated and unused. Causal mask is computed from sequence positions
         key_init (scalar or NumPy array or :mod:`cntk.initializer`, defaults to :func:`~cntk.initializer.glorot_uniform` ): initial value of weights `W`
         key_init_bias (scalar or NumPy array or :mod:`cntk.initializer`, defaults to 0): initial value of weights `b`
         query_init (scalar or NumPy array or :mod:`cntk.initializer`, defaults to :func:`~cntk.initializer.glorot_uniform` ): initial value of weights `W`
@@ -295,6 +332,7 @@ def TransformerEncoderBlock(num_heads: int, model_dim: int, intermediate_dim: in
         init_bias (scalar or NumPy array or :mod:`cntk.initializer`, defaults to 0): initial value of weights `b`
         initial_scale (float, default 1): initial value for the ``scale`` parameter aka gamma
         initial_bias (float, default 0): initial value for the ``bias`` parameter aka beta
+        batch_heads (bool): compute all heads of the self attention at once with a single batched matmul and softmax
 
     Returns:
         :class:`~cntk.ops.functions.Function`:
@@ -306,7 +344,7 @@ def TransformerEncoderBlock(num_heads: int, model_dim: int, intermediate_dim: in
                                         value_init=value_init, value_init_bias=value_init_bias,
                                         init=mha_init, init_bias=mha_init_bias,
                                         initial_scale=mha_initial_scale, initial_bias=mha_initial_bias,
-                                        name='SelfAttention')
+                                        batch_heads=batch_heads, name='SelfAttention')
 
     feed_foward = PositionwiseFeedForward(model_dim, intermediate_dim, dropout_rate=dropout_rate,
                                           intermediate_init=intermediate_init, intermediate_init_bias=intermediate_init_bias,
@@ -350,7 +388,7 @@ def TransformerDecoderBlock(num_heads: int, model_dim: int, intermediate_dim: in
         intermediate_dim (int): hidden/ intermediate dimension within position-wise feed-forward layer
         dropout_rate (float): probability of dropping out an element in the position-wise feed-forward
         obey_sequence_order (bool, defaults True): do not let attention peek into future values
-        max_seq_len (int): max sequence length possible, used to ensure that sequence order is obeyed
+        max_seq_len (int): deprecated and unused. Causal mask is computed from sequence positions
         mha1_key_init (scalar or NumPy array or :mod:`cntk.initializer`, defaults to :func:`~cntk.initializer.glorot_uniform` ): initial value of weights `W`
         mha1_key_init_bias (scalar or NumPy array or :mod:`cntk.initializer`, defaults to 0): initial value of weights `b`
         mha1_query_init (scalar or NumPy array or :mod:`cntk.initializer`, defaults to :func:`~cntk.initializer.glorot_uniform` ): initial value of weights `W`
@@ -468,7 +506,7 @@ def TransformerDecoder(n: int, num_heads: int, model_dim: int, intermediate_dim:
         model_dim (int): number of hidden dim in final output of multi-head attention
         intermediate_dim (int): hidden/ intermediate dimension within position-wise feed-forward layer
         dropout_rate (float): probability of dropping out an element in the position-wise feed-forward
-        max_seq_len: max sequence length possible, used to ensure that sequence order is obeyed
+        max_seq_len: deprecated and unused. Causal mask is computed from sequence positions
 
     Returns:
         :class:`~cntk.ops.functions.Function`:
@@ -517,7 +555,7 @@ def Transformer(num_encoder_blocks: int = 6, num_decoder_blocks=6, num_heads_enc
         decoder_intermediate_dim (int): hidden/ intermediate dimension within position-wise feed-forward layer of decoder
         encoder_dropout_rate (float): probability of dropping out an element in the position-wise feed-forward of encoder
         decoder_dropout_rate (float): probability of dropping out an element in the position-wise feed-forward of decoder
-        max_seq_len_decoder: max sequence length in decoding sequence. Used for preventing attention peeking into future values.
+        max_seq_len_decoder: deprecated and unused. Causal mask of the decoder is computed from sequence positions
 
     Returns:
         :class:`~cntk.ops.functions.Function`:
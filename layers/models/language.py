@@ -2,7 +2,8 @@ from ...layers import Recurrence, LSTM, Embedding
 from cntk.layers import Label
 
 
-def PretrainedWikitext103LanguageModel(model_file_path: str, weight_drop_rate: float = None, v_dropout_rate: float = None):
+def PretrainedWikitext103LanguageModel(model_file_path: str, weight_drop_rate: float = None, v_dropout_rate: float = None,
+                                       index_input: bool = False):
     """ General Language Model from fastai's ULMFIT by Jeremy Howard and Sebastian Ruder
 
     Universal  Language  ModelFine-tuning (ULMFiT) is an effective transfer learning
@@ -40,6 +41,8 @@ def PretrainedWikitext103LanguageModel(model_file_path: str, weight_drop_rate: f
         model_file_path (str): file path to the converted model (not the original pytorch model).
         weight_drop_rate (float): amount of weight drop to be done on the recurrent weights of the LSTM
         v_dropout_rate (float): amount of variational dropout to apply to input and outputs of the recurrent layers.
+        index_input (bool): whether the input is the integer id of the token, of shape (1, ), instead of a one-hot
+          vector. The embedding lookup is then a row gather. The prediction is unchanged.
 
     Returns:
         :class:`~cntk.ops.functions.Function`:
@@ -71,7 +74,8 @@ def PretrainedWikitext103LanguageModel(model_file_path: str, weight_drop_rate: f
     assert hidden_dim1 == 1150
     assert hidden_dim2 == 400
 
-    embedding, predict = Embedding(shape=(), init=model_params['0.encoder.weight'][:], enable_weight_tying=True)
+    embedding, predict = Embedding(shape=(), init=model_params['0.encoder.weight'][:], enable_weight_tying=True,
+                                   index_input=index_input)
 
     rnn0 = LSTM(shape=(hidden_dim0,), weight_drop_rate=weight_drop_rate,
                 ih_init=model_params['0.rnns.0.module.weight_ih_l0'][:].T,
@@ -147,8 +147,19 @@ def create_imagenet_model_bottleneck(input, num_stack_layers, num_classes, strid
     return z
 
 
-def UNET(num_classes, base_num_filters, pad=False):
-    """ For semantic segmentation """
+def UNET(num_classes, base_num_filters, pad=False, upsample_mode='nearest'):
+    """ For semantic segmentation
+
+    Arguments:
+        num_classes (int): number of segmentation classes
+        base_num_filters (int): number of filters in the first layer, doubles after every down sampling
+        pad (bool): whether to pad in convolution
+        upsample_mode (str): 'nearest' or 'bilinear' upsampling in the up path
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`
+
+    """
     # TODO: allow for depth to be varied
     f = [base_num_filters * 2 ** i for i in range(5)]
 
@@ -195,10 +206,10 @@ def UNET(num_classes, base_num_filters, pad=False):
         feature_map5 = centre_2(centre_1(feature_map4))
 
         # up path
-        feature_map6 = up1_2(up1_1(Cx.centre_crop_and_splice(feature_map3, Cx.upsample(feature_map5))))
-        feature_map7 = up2_2(up2_1(Cx.centre_crop_and_splice(feature_map2, Cx.upsample(feature_map6))))
-        feature_map8 = up3_2(up3_1(Cx.centre_crop_and_splice(feature_map1, Cx.upsample(feature_map7))))
-        feature_map9 = up4_2(up4_1(Cx.centre_crop_and_splice(feature_map0, Cx.upsample(feature_map8))))
+        feature_map6 = up1_2(up1_1(Cx.centre_crop_and_splice(feature_map3, Cx.upsample(feature_map5, 2, upsample_mode))))
+        feature_map7 = up2_2(up2_1(Cx.centre_crop_and_splice(feature_map2, Cx.upsample(feature_map6, 2, upsample_mode))))
+        feature_map8 = up3_2(up3_1(Cx.centre_crop_and_splice(feature_map1, Cx.upsample(feature_map7, 2, upsample_mode))))
+        feature_map9 = up4_2(up4_1(Cx.centre_crop_and_splice(feature_map0, Cx.upsample(feature_map8, 2, upsample_mode))))
 
         prediction = clf(feature_map9)
         return prediction
@@ -338,3 +338,65 @@ def SequenceDropout(dropout_rate: float, seed=SentinelValueForAutoSelectRandomSe
         return mask * x
 
     return inner
+
+
+def Streaming(layer, past_context: int, future_context: int = 0, name=''):
+    """ Evaluates a sequence layer chunk by chunk, e.g. on live audio, with constant cost per chunk.
+
+    `layer` must only look at a bounded number of items around every position, i.e. its output at `t` depends on
+    the inputs in [t - past_context, t + future_context]. The last `past_context + future_context` input frames are
+    carried from chunk to chunk as state. Every chunk is evaluated together with these frames and only outputs
+    whose receptive field lies entirely within them are emitted. The output is therefore delayed
+    by `future_context` items. Feed `future_context` zero frames at the end of the stream to flush it.
+
+    Starting from a zero state, the streamed outputs are identical to evaluating the layer on the whole sequence
+    if the layer pads the sequence boundaries with zeros and uses a stride of 1 along the sequence axis. Receptive
+    fields of the layers in this package:
+
+        SequentialConvolution((k, ...), pad=True), odd k: past_context=future_context=(k - 1) // 2
+        SequentialMaxPooling((k, ...), pad=True):      past_context=(k - 1) // 2, future_context=k // 2
+        SequentialAveragePooling((k, ...), pad=True):  past_context=(k - 1) // 2, future_context=k // 2
+        Cx.sequence.window_causal(x, width, slide=1):  past_context=width - 1
+        vFSMN(..., num_past_context, num_future_context): past_context=num_past_context, future_context=num_future_context
+
+    Recurrent layers such as `QRNN` carry their own state, see `QRNN(streaming=True)`.
+
+    Example:
+        a = C.sequence.input_variable(10)
+        state = C.input_variable((3 + 1, 10))
+        output, new_state = Streaming(vFSMN(20, C.relu, 3, 1), past_context=3, future_context=1)(a, state).outputs
+
+        s = np.zeros((1, 4, 10), dtype=np.float32)
+        for chunk in chunks:  # chunk: [np.ndarray of shape (chunk_length, 10)]
+            outputs = C.combine(output, new_state).eval({a: chunk, state: s})
+            s = outputs[new_state]
+
+    Arguments:
+        layer: sequence layer with a bounded receptive field along the sequence axis
+        past_context (int): number of past items the layer looks at
+        future_context (int): number of future items the layer looks at
+        name (str, defaults to ''): the name of the Function instance in the network
+
+    Returns:
+        A function that accepts a chunk and the state, (past_context + future_context, ) + chunk shape, and returns
+        a :class:`~cntk.ops.functions.Function` with two outputs, the output of the chunk (delayed by
+        `future_context` items) and the new state
+    """
+    if past_context < 0 or future_context < 0:
+        raise ValueError(f"context must not be negative but got {past_context} and {future_context}")
+
+    num_frames = past_context + future_context
+    if num_frames == 0:
+        raise ValueError("layers without context do not carry state and can be evaluated on chunks directly")
+
+    def stream(x, state):
+        y, new_state = Cx.sequence.prepend_state(x, state).outputs
+
+        r = layer(y)
+        r = C.sequence.slice(r, past_context, -future_context if future_context > 0 else 0)
+        # r: [#, **] [*], one output for every item of the chunk
+
+        r = C.to_sequence_like(C.sequence.unpack(r, padding_value=0, no_mask_output=True), x)
+        return C.combine([r.output, new_state], name=name)
+
+    return stream
@@ -0,0 +1,57 @@
+import cntk as C
+from cntkx.layers.models import MultiHeadAttention, ScaledDotProductAttention
+from cntkx.misc.benchmark import count_nodes, benchmark
+import numpy as np
+import multiprocessing as mp
+import resource
+import time
+
+
+def multi_head_throughput(model_dim=512, minibatch_size=16, seq_length=256):
+    """ graph node count and throughput of per-head loop vs head-batched multi-head attention """
+    a = C.sequence.input_variable(model_dim)
+    n = np.random.random((minibatch_size, seq_length, model_dim)).astype(np.float32)
+
+    for num_heads in [1, 4, 8, 16]:
+        for batch_heads in [False, True]:
+            attended = MultiHeadAttention(num_heads, model_dim, batch_heads=batch_heads)(a, a, a)
+
+            nodes = count_nodes(attended)
+            duration = benchmark(attended, {a: n})
+            throughput = minibatch_size * seq_length / duration
+
+            print(f"num_heads: {num_heads}, batch_heads: {batch_heads}, nodes: {nodes}, "
+                  f"duration: {duration:.4f}s, throughput: {throughput:.0f} tokens/s")
+
+
+def peak_memory(seq_length, block_size, queue):
+    """ runs in a separate process so that peak resident memory is measured per configuration """
+    a = C.sequence.input_variable(64)
+    attended = ScaledDotProductAttention(block_size=block_size)(a, a, a)
+    n = np.random.random((1, seq_length, 64)).astype(np.float32)
+
+    start = time.time()
+    attended.eval({a: n})
+    duration = time.time() - start
+
+    queue.put((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, duration))
+
+
+def tiled_memory():
+    """ peak memory and duration of full vs block-wise (online softmax) attention. The block-wise graph keeps the
+    scores of every block, so it is not expected to use less memory than full attention """
+    for seq_length in [1000, 4000, 8000]:
+        for block_size in [None, 256, 1024]:
+            queue = mp.Queue()
+            process = mp.Process(target=peak_memory, args=(seq_length, block_size, queue))
+            process.start()
+            max_rss, duration = queue.get()
+            process.join()
+
+            print(f"seq_length: {seq_length}, block_size: {block_size}, peak memory: {max_rss / 1024:.0f}MB, "
+                  f"duration: {duration:.4f}s")
+
+
+if __name__ == '__main__':
+    multi_head_throughput()
+    tiled_memory()
@@ -3,6 +3,8 @@ from cntkx.layers.models import Transformer, TransformerDecoder, TransformerEnco
 from cntkx.layers.models import MultiHeadAttentionBlock, TransformerEncoderBlock, TransformerDecoderBlock
 from cntkx.layers.models import ScaledDotProductAttention, GaussianWindowAttention, PreTrainedBertEncoder
 from cntkx.layers.models import PreTrainedBertModel, GaussianAttentionSeqImage, LinearAttention, LinearAttentionModel
+import cntkx as Cx
+from cntkx.misc.benchmark import count_nodes
 import numpy as np
 import pytest
 
@@ -39,6 +41,50 @@ def test_scaled_dot_product_attention2():
     assert results[0].shape == n1.shape, f"Wrong expected shape {results[0].shape} != {n1.shape}"
 
 
+def test_scaled_dot_product_attention_causal():
+    """ causal mask computed from positions matches numpy reference without max_seq_len """
+    a = C.sequence.input_variable(5)
+    b = ScaledDotProductAttention(obey_sequence_order=True)(a, a, a)
+
+    n = [np.random.random((7, 5)).astype(np.float32),
+         np.random.random((3, 5)).astype(np.float32)]
+
+    results = b.eval({a: n})
+
+    for result, x in zip(results, n):
+        scores = x @ x.T / np.sqrt(5)
+        scores = np.where(np.tril(np.ones_like(scores)) > 0, scores, -1e+30)
+        weights = np.exp(scores - scores.max(axis=-1, keepdims=True))
+        weights = weights / weights.sum(axis=-1, keepdims=True)
+        np.testing.assert_almost_equal(result, weights @ x, decimal=5)
+
+
+def test_scaled_dot_product_attention_tiled():
+    """ online softmax over key blocks gives the same result as full attention """
+    a = C.sequence.input_variable(5)
+    v = C.sequence.input_variable(3)
+
+    n = np.random.random((2, 7, 5)).astype(np.float32)
+    m = np.random.random((2, 7, 3)).astype(np.float32)
+
+    for obey_sequence_order in [False, True]:
+        desired = ScaledDotProductAttention(obey_sequence_order)(a, a, v).eval({a: n, v: m})
+
+        for block_size in [1, 3, 7, 16]:
+            b = ScaledDotProductAttention(obey_sequence_order, block_size=block_size)(a, a, v)
+            assert b.shape == (3, )
+
+            results = b.eval({a: n, v: m})
+            np.testing.assert_almost_equal(results, desired, decimal=5)
+
+    b = MultiHeadAttention(num_heads=2, model_dim=10, block_size=4)(a, a, a)
+    assert b.shape == (10, )
+    b.eval({a: [np.random.random((9, 5)).astype(np.float32), np.random.random((2, 5)).astype(np.float32)]})
+
+    with pytest.raises(ValueError):
+        MultiHeadAttention(num_heads=2, model_dim=10, batch_heads=True, block_size=4)
+
+
 def test_scaled_dot_product_attention3():
     """ query and key-value musts have same dimensions """
     query = C.sequence.input_variable(5)
@@ -163,10 +209,15 @@ def test_multi_head_attention2():
     n = np.random.random((2, 3, 5)).astype(np.float32)
     attended.eval({a: n})
 
-    # Exceed max_seq_length should raise error
+    # max_seq_len is no longer a limit on sequence length
     n = np.random.random((2, 11, 5)).astype(np.float32)
-    with pytest.raises(Exception):
-        attended.eval({a: n})
+    results = attended.eval({a: n})
+    assert results.shape == (2, 11, 30)
+
+    # changing future values must not change current output
+    m = n.copy()
+    m[:, 6:] = np.random.random((2, 5, 5))
+    np.testing.assert_almost_equal(attended.eval({a: m})[:, :6], results[:, :6], decimal=5)
 
 
 def test_multi_head_attention3():
@@ -188,6 +239,46 @@ def test_multi_head_attention3():
     attended.eval({a: n, b: m})
 
 
+def test_multi_head_attention_batch_heads():
+    """ head-batched attention gives the same result as attention applied head by head """
+    num_heads, head_dim = 4, 3
+    a = C.sequence.input_variable(num_heads * head_dim)
+    v = C.sequence.input_variable(num_heads * 2)
+
+    batched = Cx.multi_head_scaled_dot_product_attention(a, a, v, num_heads)
+    assert batched.shape == (num_heads * 2, )
+
+    per_head = [Cx.scaled_dot_product_attention(C.slice(a, 0, i * head_dim, (i + 1) * head_dim),
+                                                C.slice(a, 0, i * head_dim, (i + 1) * head_dim),
+                                                C.slice(v, 0, i * 2, (i + 1) * 2)) for i in range(num_heads)]
+    per_head = C.splice(*per_head)
+
+    n = np.random.random((3, 7, num_heads * head_dim)).astype(np.float32)
+    m = np.random.random((3, 7, num_heads * 2)).astype(np.float32)
+
+    np.testing.assert_almost_equal(batched.eval({a: n, v: m}), per_head.eval({a: n, v: m}), decimal=5)
+
+    batched = Cx.multi_head_scaled_dot_product_attention(a, a, v, num_heads, obey_sequence_order=True, max_seq_len=10)
+    per_head = [Cx.scaled_dot_product_attention(C.slice(a, 0, i * head_dim, (i + 1) * head_dim),
+                                                C.slice(a, 0, i * head_dim, (i + 1) * head_dim),
+                                                C.slice(v, 0, i * 2, (i + 1) * 2),
+                                                obey_sequence_order=True, max_seq_len=10) for i in range(num_heads)]
+    per_head = C.splice(*per_head)
+
+    np.testing.assert_almost_equal(batched.eval({a: n, v: m}), per_head.eval({a: n, v: m}), decimal=5)
+
+    # layer level
+    b = MultiHeadAttention(num_heads=6, model_dim=30, batch_heads=True)(a, a, a)
+    assert b.shape == (30, )
+
+    n = [np.random.random((2, num_heads * head_dim)).astype(np.float32),
+         np.random.random((6, num_heads * head_dim)).astype(np.float32)]
+
+    results = b.eval({a: n})
+    assert results[0].shape == (2, 30)
+    assert results[1].shape == (6, 30)
+
+
 def test_multi_head_attention_w_recurrence_lstm():
     """ combined multi head attention with lstm recurrence
 
@@ -659,3 +750,71 @@ def test_linear_attention_model():
 
     n1 = [np.random.random((10, 24)) for __ in range(10)]
     b.eval({a: n1})
+
+
+@pytest.mark.parametrize("obey_sequence_order", [False, True])
+def test_attention_packed_sequences(obey_sequence_order):
+    """ attention over packed sequences with segment ids gives the same results as over the unpacked sequences """
+    dim = 8
+    sequences = [np.random.random((l, dim)).astype(np.float32) for l in (3, 7, 2, 5, 1, 6)]
+    packed, segment_ids, locations = Cx.misc.pack_sequences(sequences, max_length=10)
+    single_segment_ids = [np.zeros((len(sequence), 1), dtype=np.float32) for sequence in sequences]
+
+    a = C.sequence.input_variable(dim)
+    ids = C.sequence.input_variable(1)
+
+    models = [ScaledDotProductAttention(obey_sequence_order)(a, a, a, ids),
+              ScaledDotProductAttention(obey_sequence_order, block_size=4)(a, a, a, ids),
+              MultiHeadAttention(2, dim, obey_sequence_order, segmented=True)(a, a, a, ids, ids),
+              MultiHeadAttention(2, dim, obey_sequence_order, batch_heads=True, segmented=True)(a, a, a, ids, ids)]
+
+    for model in models:
+        desired = model.eval({a: sequences, ids: single_segment_ids})
+        results = Cx.misc.unpack_sequences(model.eval({a: packed, ids: segment_ids}), locations)
+
+        for result, d in zip(results, desired):
+            np.testing.assert_almost_equal(result, d, decimal=5)
+
+    # a single segment is the same as no segment ids
+    desired = ScaledDotProductAttention(obey_sequence_order)(a, a, a).eval({a: sequences})
+    results = models[0].eval({a: sequences, ids: single_segment_ids})
+
+    for result, d in zip(results, desired):
+        np.testing.assert_almost_equal(result, d, decimal=5)
+
+
+def test_attention_packed_sequences_segment_position():
+    """ positions restarting at every packed segment make packed attention match unpacked attention """
+    dim = 8
+    sequences = [np.random.random((l, dim)).astype(np.float32) for l in (3, 7, 2, 5, 1, 6)]
+    packed, segment_ids, locations = Cx.misc.pack_sequences(sequences, max_length=10)
+    single_segment_ids = [np.zeros((len(sequence), 1), dtype=np.float32) for sequence in sequences]
+
+    a = C.sequence.input_variable(dim)
+    ids = C.sequence.input_variable(1)
+
+    # position dependent input, so that a segment position that does not restart changes the result
+    b = a + C.sin(Cx.sequence.position(a, segment_ids=ids) * 0.1)
+    c = ScaledDotProductAttention(obey_sequence_order=True)(b, b, b, ids)
+
+    desired = c.eval({a: sequences, ids: single_segment_ids})
+    results = Cx.misc.unpack_sequences(c.eval({a: packed, ids: segment_ids}), locations)
+
+    for result, d in zip(results, desired):
+        np.testing.assert_almost_equal(result, d, decimal=5)
+
+
+def test_scaled_dot_product_attention_tiled_graph_size():
+    """ tiled attention folds a fixed size state over key blocks, so its graph does not grow with the key length """
+    a = C.sequence.input_variable(16)
+    graphs = [ScaledDotProductAttention(block_size=block_size)(a, a, a) for block_size in (4, 64)]
+    assert count_nodes(graphs[0]) == count_nodes(graphs[1])
+
+    # many key blocks per sequence
+    n = [np.random.random((300, 16)).astype(np.float32)]
+    desired = ScaledDotProductAttention()(a, a, a).eval({a: n})
+
+    for b in graphs:
+        assert b.shape == (16, )
+        results = b.eval({a: n})
+        np.testing.assert_almost_equal(results[0], desired[0], decimal=5)
@@ -100,4 +100,28 @@ for block_name, prediction in zip(block_names, predictions):
     performance.append(block_performance)
 
 for block_name, duration, loss_result, num_parameters in performance:
-    print(f"name: {block_name}, duration: {duration}, loss: {loss_result}, parameter_count: {num_parameters}")
\ No newline at end of file
+    print(f"name: {block_name}, duration: {duration}, loss: {loss_result}, parameter_count: {num_parameters}")
+
+# ====================================================================
+# QRNN f-pooling: sequential recurrence vs parallel scan
+# ====================================================================
+hidden_dim = 256
+qrnn_minibatch_size = 8
+qrnn_input = C.sequence.input_variable(input_dim)
+
+for seq_length in [100, 1000, 10000]:
+    n = np.random.random((qrnn_minibatch_size, seq_length, input_dim)).astype(np.float32)
+
+    durations = []
+    for parallel_scan in [False, True]:
+        hidden = QRNN(window=2, hidden_dim=hidden_dim, parallel_scan=parallel_scan, max_seq_len=seq_length)(qrnn_input)
+        loss = C.sequence.reduce_sum(C.reduce_sum(hidden))
+        loss.grad({qrnn_input: n}, wrt=loss.parameters)  # warm up
+
+        start = time.time()
+        for __ in range(5):
+            loss.grad({qrnn_input: n}, wrt=loss.parameters)
+        durations.append((time.time() - start) / 5)
+
+    print(f"qrnn seq_length: {seq_length}, recurrence: {durations[0]:.4f}s, parallel scan: {durations[1]:.4f}s, "
+          f"speedup: {durations[0] / durations[1]:.2f}x")
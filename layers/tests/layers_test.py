@@ -1,11 +1,12 @@
 import cntk as C
 import cntkx as Cx
-from cntkx.layers import QRNN, SinusoidalPositionalEmbedding, SpatialPyramidPooling, GatedLinearUnit
+from cntkx.layers import QRNN, QRNNStack, SinusoidalPositionalEmbedding, SpatialPyramidPooling, GatedLinearUnit
 from cntkx.layers import BertEmbeddings, PositionalEmbedding, SequentialAveragePooling
 from cntkx.layers import PreTrainedBertEmbeddings, PositionwiseFeedForward, SequentialMaxPooling
-from cntkx.layers import vFSMN, cFSMN, SequentialConcatPooling, SequentialDense
+from cntkx.layers import vFSMN, cFSMN, SequentialConcatPooling, SequentialDense, Embedding
 import numpy as np
 import math
+import pytest
 
 
 def test_qrnn():
@@ -29,6 +30,102 @@ def test_qrnn1():
     qrnn.eval({i: [n1, n2]})
 
 
+def test_qrnn_parallel_scan():
+    """ parallel scan f-pooling gives the same result as the sequential recurrence """
+    input_dim = 3
+    i = C.sequence.input_variable(input_dim)
+
+    sequential = QRNN(window=2, hidden_dim=20, return_full_state=True)(i)
+    parallel = QRNN(window=2, hidden_dim=20, return_full_state=True, parallel_scan=True, max_seq_len=64)(i)
+
+    for p in parallel.parameters:
+        p.value = next(q for q in sequential.parameters if q.name == p.name and q.shape == p.shape).value
+
+    n = [np.random.random((l, input_dim)).astype(np.float32) for l in (15, 1, 10, 64)]
+
+    for desired, result in zip(sequential.outputs, parallel.outputs):
+        for d, r in zip(C.combine(desired).eval({i: n}), C.combine(result).eval({i: n})):
+            np.testing.assert_almost_equal(r, d, decimal=5)
+
+
+@pytest.mark.parametrize("parallel_scan", [False, True])
+@pytest.mark.parametrize("window", [1, 3])
+def test_qrnn_streaming(window, parallel_scan):
+    """ chunk by chunk evaluation gives the same output as evaluating the whole sequence """
+    input_dim, hidden_dim = 3, 5
+    i = C.sequence.input_variable(input_dim)
+    cell = C.input_variable(hidden_dim)
+    past_inputs = C.input_variable((window - 1, input_dim)) if window > 1 else None
+
+    full = QRNN(window=window, hidden_dim=hidden_dim)(i)
+    qrnn = QRNN(window=window, hidden_dim=hidden_dim, parallel_scan=parallel_scan, max_seq_len=16, streaming=True)
+    streamed = qrnn(i, past_inputs, cell) if window > 1 else qrnn(i, cell)
+
+    for p in streamed.parameters:
+        p.value = next(q for q in full.parameters if q.name == p.name and q.shape == p.shape).value
+
+    n = np.random.random((12, input_dim)).astype(np.float32)
+    desired = full.eval({i: [n]})[0]
+
+    # state in the same order as the new state outputs of the layer
+    state = {past_inputs: np.zeros((1, window - 1, input_dim), dtype=np.float32)} if window > 1 else {}
+    state[cell] = np.zeros((1, hidden_dim), dtype=np.float32)
+
+    h, new_state = streamed.outputs[0], streamed.outputs[1:]
+    results = []
+    for chunk in (n[:5], n[5:6], n[6:]):
+        r = streamed.eval({i: [chunk], **state})
+        results.append(r[h][0])
+        state = {variable: r[output] for variable, output in zip(state, new_state)}
+
+    np.testing.assert_almost_equal(np.concatenate(results, axis=0), desired, decimal=5)
+
+
+def test_qrnn_stack():
+    """ fused bidirectional qrnn stack against a numpy reference """
+    input_dim, hidden_dim, window, num_layers = 3, 4, 2, 2
+    i = C.sequence.input_variable(input_dim)
+    stack = QRNNStack(num_layers=num_layers, hidden_dim=hidden_dim, window=window, max_seq_len=16)(i)
+
+    assert stack.shape == (2 * hidden_dim, )
+
+    def sigmoid(v):
+        return 1 / (1 + np.exp(-v))
+
+    def reference(x):
+        for layer in range(num_layers):
+            dense = [p for p in stack.parameters if p.name == f'qrnn_dense_{layer}']
+            w = next(p for p in dense if len(p.shape) == 4).value
+            b = next(p for p in dense if len(p.shape) == 3).value
+
+            y = np.einsum('ti,iwgd->twgd', x, w) + b
+            g = y[:, 0].copy()
+            for k in range(1, window):
+                g[k:, :, :hidden_dim] += y[:-k, k, :, :hidden_dim]
+                g[:-k, :, hidden_dim:] += y[k:, k, :, hidden_dim:]
+
+            z, f, o = np.tanh(g[:, 0]), sigmoid(g[:, 1]), sigmoid(g[:, 2])
+
+            c = np.zeros_like(z)
+            forward, backward = np.zeros(hidden_dim), np.zeros(hidden_dim)
+            for t in range(len(x)):
+                forward = f[t, :hidden_dim] * forward + (1 - f[t, :hidden_dim]) * z[t, :hidden_dim]
+                c[t, :hidden_dim] = forward
+            for t in reversed(range(len(x))):
+                backward = f[t, hidden_dim:] * backward + (1 - f[t, hidden_dim:]) * z[t, hidden_dim:]
+                c[t, hidden_dim:] = backward
+
+            x = o * c
+
+        return x
+
+    n = [np.random.random((l, input_dim)).astype(np.float32) for l in (7, 1, 16)]
+    results = stack.eval({i: n})
+
+    for r, x in zip(results, n):
+        np.testing.assert_almost_equal(r, reference(x), decimal=5)
+
+
 def test_sinusoidal_positional_embedding():
     seq = 50
     dim = 100
@@ -55,6 +152,22 @@ def test_sinusoidal_positional_embedding():
     # plt.show()
 
 
+def test_sinusoidal_positional_embedding_table():
+    """ table lookup, including positions beyond the table, matches the analytic sinusoids """
+    dim = 99
+    a = C.sequence.input_variable(dim)
+    analytic = SinusoidalPositionalEmbedding(dim)(a)
+    table = SinusoidalPositionalEmbedding(dim, table_size=16, max_seq_len=128)(a)
+
+    assert table.shape == (dim, )
+
+    # positions from max_seq_len onwards fall back to the analytic sinusoids
+    n = [np.random.random((l, dim)).astype(np.float32) for l in (10, 128, 1, 300)]
+
+    for desired, result in zip(analytic.eval({a: n}), table.eval({a: n})):
+        np.testing.assert_almost_equal(result, desired, decimal=4)
+
+
 def test_spatial_pyramid_pooling():
     # test 1
     n = np.random.random((3, 3, 32, 32)).astype(np.float32)
@@ -105,6 +218,33 @@ def test_gated_linear_unit():
     b.eval({a: [n1, n2]})
 
 
+def test_embedding_index_input():
+    """ row gather on token ids matches the lookup on one-hot vectors """
+    vocab_size, dim = 7, 4
+    table = np.random.random((vocab_size, dim)).astype(np.float32)
+
+    a = C.sequence.input_variable(vocab_size, is_sparse=True)
+    ids = C.sequence.input_variable(1)
+    one_hot = Embedding(dim, init=table)(a)
+    embed, transpose_embed = Embedding(dim, init=table, index_input=True, enable_weight_tying=True)
+    gathered = embed(ids)
+
+    assert gathered.shape == (dim, )
+    assert Embedding(dim, index_input=True, input_dim=vocab_size).E.shape == (vocab_size, dim)
+
+    tokens = [[1, 0, 6], [3]]
+    n = [np.array(t, dtype=np.float32)[:, None] for t in tokens]
+    desired = one_hot.eval({a: C.Value.one_hot(tokens, num_classes=vocab_size)})
+
+    for d, r in zip(desired, gathered.eval({ids: n})):
+        np.testing.assert_almost_equal(r, d)
+
+    assert transpose_embed(gathered).shape == (vocab_size, )
+
+    with pytest.raises(ValueError):
+        Embedding(dim, index_input=True)
+
+
 def test_positional_embedding():
     max_seq_length = 100
     hidden_dim = 120
@@ -484,6 +624,24 @@ def test_sequential_average_pooling():
     np.testing.assert_almost_equal(output[1:-1], desired[1:-1])
 
 
+@pytest.mark.parametrize("width, max_seq_len", [(8, 2 ** 16), (12, 32)])
+def test_sequential_average_pooling_wide_window_end_to_end(width, max_seq_len):
+    """ wide windows use the sliding mean, which runs a prefix sum inside the pooling block """
+    a = C.sequence.input_variable((25, ))
+    b = SequentialAveragePooling(filter_shape=(width,), pad=True, max_seq_len=max_seq_len)(a)
+
+    after = width // 2
+    before = width - 1 - after
+
+    n = [np.random.random((l, 25)).astype(np.float32) for l in (3, 8, 20)]
+    results = b.eval({a: n})
+
+    for r, d in zip(results, n):
+        padded = np.pad(d, ((before, after), (0, 0)), mode='constant', constant_values=0)
+        desired = np.stack([padded[t: t + width].mean(axis=0) for t in range(d.shape[0])])
+        np.testing.assert_almost_equal(r, desired, decimal=5)
+
+
 def test_sequential_concat_pooling():
     a = C.sequence.input_variable((3, 10))
     b = SequentialConcatPooling(filter_shape=(2, 2), strides=2)(a)
@@ -927,6 +1085,46 @@ def test_cfsmn():
     b.eval({a: n})
 
 
+@pytest.mark.parametrize("input_dim", [None, 4])
+def test_vfsmn_memory(input_dim):
+    """ memory block taps the given number of past and future frames """
+    in_dim, hidden_dim, num_past_context, num_future_context = 4, 6, 2, 3
+    a = C.sequence.input_variable(in_dim)
+    b = vFSMN(hidden_dim, None, num_past_context, num_future_context, input_dim=input_dim)(a)
+
+    b.a.value = np.random.random(b.a.shape).astype(np.float32)
+    b.b.value = np.random.random(b.b.shape).astype(np.float32)
+
+    def reference(x):
+        padded = np.pad(x, ((num_past_context, num_future_context), (0, 0)))
+        memory = np.zeros_like(x)
+        for t in range(x.shape[0]):
+            offsets = [0] + [-(k + 1) for k in range(num_past_context)] + [k + 1 for k in range(num_future_context)]
+            for tap, offset in enumerate(offsets):
+                memory[t] += b.a.value[tap] * padded[t + num_past_context + offset]
+
+        return x @ b.W.value + memory @ b.H.value + b.b.value
+
+    n = [np.random.random((l, in_dim)).astype(np.float32) for l in (15, 1, 4)]
+    results = b.eval({a: n})
+
+    for r, x in zip(results, n):
+        np.testing.assert_almost_equal(r, reference(x), decimal=5)
+
+
+
+def test_vfsmn_composable():
+    """ vFSMN is a Function and can be applied to a placeholder inside another layer """
+    in_dim = 5
+    a = C.sequence.input_variable(in_dim)
+
+    for input_dim in [None, in_dim]:
+        model = C.layers.Sequential([vFSMN(8, C.relu, 2, 1, input_dim=input_dim), C.layers.Dense(3)])
+        b = model(a)
+
+        assert b.shape == (3, )
+        b.eval({a: [np.random.random((l, in_dim)).astype(np.float32) for l in (6, 1)]})
+
 def test_sequential_dense():
     # ====================================================
     # window = 2 stride = 1
@@ -1039,3 +1237,27 @@ def test_sequence_se_block():
     n = [np.random.random((16, 32, 24)).astype(np.float32),
          np.random.random((7, 32, 24)).astype(np.float32), ]
     b.eval({a: n})
+
+
+def test_sequential_pooling_wide_window():
+    """ wide windows use sliding window reductions and match pooling over zero padded windows """
+    a = C.sequence.input_variable(10)
+    n = [np.random.random((l, 10)).astype(np.float32) - 0.5 for l in (5, 23, 40)]
+
+    for pad in [True, False]:
+        for width, stride in [(8, 1), (9, 3), (16, 4), (33, 1), (40, 5)]:
+            if pad:
+                after = (width - 1) // 2 if width % 2 else width // 2
+                before = after if width % 2 else after - 1
+            else:
+                before, after = 0, width - 1
+
+            b = SequentialMaxPooling(filter_shape=(width, ), strides=(stride, ), pad=pad)(a)
+            c = SequentialAveragePooling(filter_shape=(width, ), strides=(stride, ), pad=pad, max_seq_len=64)(a)
+
+            for r_max, r_ave, d in zip(b.eval({a: n}), c.eval({a: n}), n):
+                padded = np.pad(d, ((before, after), (0, 0)), mode='constant', constant_values=0)
+                windows = np.stack([padded[t: t + width] for t in range(d.shape[0])])[::stride]
+
+                np.testing.assert_almost_equal(r_max, windows.max(axis=1))
+                np.testing.assert_almost_equal(r_ave, windows.mean(axis=1), decimal=5)
@@ -25,6 +25,11 @@ def test_unet():
 
     a = C.input_variable((3, 256, 256))
     b = UNET(num_classes=10, base_num_filters=2, pad=False)(a)
+
+    a = C.input_variable((3, 128, 128))
+    b = UNET(num_classes=10, base_num_filters=8, pad=True, upsample_mode='bilinear')(a)
+
+    assert b.shape == (10, 128, 128)
     # TODO: assert the shape with no padding
 
 
@@ -1,7 +1,8 @@
 import cntk as C
 import numpy as np
 from cntkx.layers.sequence import Recurrence, VariationalDropout, PyramidalBiRecurrence, BiRecurrence, SequenceDropout
-from cntkx.layers import IndyLSTM
+from cntkx.layers.sequence import Streaming
+from cntkx.layers import IndyLSTM, vFSMN, SequentialMaxPooling
 from cntk.layers import LSTM
 
 
@@ -164,3 +165,32 @@ def test_sequence_dropout():
     for seq, d in zip(fv[b.output], desired):
         non_zeroed = np.count_nonzero(np.mean(seq, axis=1))
         assert non_zeroed == d
+
+
+def test_streaming():
+    """ chunk by chunk evaluation gives the same output as evaluating the whole sequence """
+    in_dim, past_context, future_context = 3, 2, 1
+
+    a = C.sequence.input_variable(in_dim)
+    state = C.input_variable((past_context + future_context, in_dim))
+
+    # a receptive field larger than that of the layer is fine, max pooling only needs one past item
+    for layer in [vFSMN(4, C.relu, past_context, future_context),
+                  SequentialMaxPooling(filter_shape=(3, ), pad=True)]:
+        full = layer(a)
+        output, new_state = Streaming(layer, past_context, future_context)(a, state).outputs
+
+        n = np.random.random((13, in_dim)).astype(np.float32)
+        desired = full.eval({a: [n]})[0]
+
+        # feed chunks of varying length, followed by future_context zero frames to flush the stream
+        chunks = [n[:4], n[4:9], n[9:], np.zeros((future_context, in_dim), dtype=np.float32)]
+
+        s = np.zeros((1, past_context + future_context, in_dim), dtype=np.float32)
+        streamed = []
+        for chunk in chunks:
+            results = C.combine(output, new_state).eval({a: [chunk], state: s})
+            streamed.append(results[output][0])
+            s = results[new_state]
+
+        np.testing.assert_almost_equal(np.concatenate(streamed, axis=0)[future_context:], desired, decimal=5)
@@ -161,6 +161,77 @@ def convert_pytorch_state_dict_to_h5_file(model_file_path: str, save_directory:
     return None
 
 
+def pack_sequences(sequences: List[np.ndarray], max_length: int):
+    """ Packs several short sequences into fewer longer sequences to reduce padding in a minibatch.
+
+    Sequences are placed with first-fit decreasing: longest first, each into the first pack with enough room left.
+    Every pack comes with segment ids that number its sequences from 0. Pass them to the `segment_ids` of
+    `cntkx.ops.sequence.position` and the attention ops so that packed sequences give the same results as
+    unpacked ones.
+
+    Example:
+        sequences = [np.random.random((l, 10)).astype(np.float32) for l in (3, 7, 2, 5)]
+        packed, segment_ids, locations = pack_sequences(sequences, max_length=10)
+
+        assert len(packed) == 2  # [7, 3] and [5, 2]
+
+        a = C.sequence.input_variable(10)
+        ids = C.sequence.input_variable(1)
+        b = Cx.scaled_dot_product_attention(a, a, a, segment_ids=ids)
+
+        results = unpack_sequences(b.eval({a: packed, ids: segment_ids}), locations)
+
+    Arguments:
+        sequences (List[np.ndarray]): sequences with the sequence axis first
+        max_length (int): maximum length of a packed sequence, must be at least as long as the longest sequence
+
+    Returns:
+        tuple of packed sequences, float32 segment ids of shape (length, 1) for every packed sequence and
+        the (pack index, start, end) location of every input sequence
+
+    """
+    if any(len(sequence) > max_length for sequence in sequences):
+        raise ValueError(f"every sequence must be at most max_length {max_length} long")
+
+    packs = []  # list of [free space, [sequence index, ...]]
+    for i in sorted(range(len(sequences)), key=lambda i: len(sequences[i]), reverse=True):
+        pack = next((pack for pack in packs if pack[0] >= len(sequences[i])), None)
+
+        if pack is None:
+            pack = [max_length, []]
+            packs.append(pack)
+
+        pack[0] -= len(sequences[i])
+        pack[1].append(i)
+
+    packed, segment_ids, locations = [], [], [None] * len(sequences)
+    for pack_index, (__, members) in enumerate(packs):
+        start = 0
+        for i in members:
+            locations[i] = (pack_index, start, start + len(sequences[i]))
+            start += len(sequences[i])
+
+        packed.append(np.concatenate([sequences[i] for i in members], axis=0))
+        segment_ids.append(np.concatenate([np.full((len(sequences[i]), 1), segment, dtype=np.float32)
+                                           for segment, i in enumerate(members)], axis=0))
+
+    return packed, segment_ids, locations
+
+
+def unpack_sequences(packed: List[np.ndarray], locations: List[tuple]) -> List[np.ndarray]:
+    """ Recovers the per sequence results of sequences packed with `pack_sequences`
+
+    Arguments:
+        packed (List[np.ndarray]): results of the packed sequences with the sequence axis first
+        locations (List[tuple]): (pack index, start, end) of every sequence as returned by `pack_sequences`
+
+    Returns:
+        List[np.ndarray] in the original order of the sequences
+
+    """
+    return [packed[pack_index][start:end] for pack_index, start, end in locations]
+
+
 ##########################################################################
 # wrapper
 ##########################################################################
@@ -0,0 +1,18 @@
+import cntk as C
+import time
+
+
+def count_nodes(model) -> int:
+    """ number of primitive functions in the graph, including those inside block functions """
+    return len(C.logging.graph.depth_first_search(model, lambda x: isinstance(x, C.Function), depth=-1))
+
+
+def benchmark(model, feed, n_iter: int = 20) -> float:
+    """ average duration in seconds of `model.eval(feed)` after one warm up evaluation """
+    model.eval(feed)  # warm up
+
+    start = time.time()
+    for __ in range(n_iter):
+        model.eval(feed)
+
+    return (time.time() - start) / n_iter
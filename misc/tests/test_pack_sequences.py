@@ -0,0 +1,22 @@
+from .. import pack_sequences, unpack_sequences
+import numpy as np
+import pytest
+
+
+def test_pack_sequences():
+    sequences = [np.random.random((l, 4)).astype(np.float32) for l in (3, 7, 2, 5, 10, 1)]
+    packed, segment_ids, locations = pack_sequences(sequences, max_length=10)
+
+    # first-fit decreasing: [10], [7, 3], [5, 2, 1]
+    assert [len(p) for p in packed] == [10, 10, 8]
+    assert sum(len(p) for p in packed) == sum(len(s) for s in sequences)
+
+    np.testing.assert_equal(segment_ids[1].ravel(), [0] * 7 + [1] * 3)
+    np.testing.assert_equal(segment_ids[2].ravel(), [0] * 5 + [1] * 2 + [2])
+    assert all(p.shape[0] == i.shape[0] for p, i in zip(packed, segment_ids))
+
+    for sequence, unpacked in zip(sequences, unpack_sequences(packed, locations)):
+        np.testing.assert_equal(sequence, unpacked)
+
+    with pytest.raises(ValueError):
+        pack_sequences(sequences, max_length=9)
@@ -3,6 +3,8 @@ import numpy as np
 from . import sequence
 from . import random
 from cntk.layers.blocks import _inject_name
+from cntk.ops.functions import UserFunction
+from abc import ABCMeta, abstractmethod
 
 
 ##########################################################################
@@ -119,34 +121,93 @@ def scalar(x, name=''):
     return inner(x)
 
 
-def cumsum(x, axis: int = -1):
+def cumsum(x, axis: int = -1, exclusive: bool = False, reverse: bool = False, scan_threshold: int = 256, name=''):
     """ Calculates the cumulative sum across a static axis
 
+    For axis of dimension `d` no larger than `scan_threshold`, the cumulative sum is computed as a single
+    matrix multiplication with a (d, d) triangular constant. For wider axes, a log-depth (Hillis-Steele)
+    scan built from slices and pads is used instead. It does O(d log d) work and requires no (d, d) constant.
+
+    Example:
+        a = C.input_variable(5)
+        b = Cx.cumsum(a)
+        c = Cx.cumsum(a, exclusive=True)
+        d = Cx.cumsum(a, reverse=True)
+
+        n = np.array([[1, 2, 3, 4, 5]]).astype(np.float32)
+        b.eval({a: n})  # [[1, 3, 6, 10, 15]]
+        c.eval({a: n})  # [[0, 1, 3, 6, 10]]
+        d.eval({a: n})  # [[15, 14, 12, 9, 5]]
+
     Arguments:
         x: input tensor
         axis (int): static axis of tensor to cumsum over
+        exclusive (bool): if True, the i-th output excludes the i-th input (i.e. output starts with zero)
+        reverse (bool): if True, the cumulative sum is taken from the end of the axis towards the start
+        scan_threshold (int): axis dimension above which the log-depth scan is used instead of the
+          triangular matrix multiplication
+        name (str, optional): the name of the Function instance in the network
 
     Returns:
         :class:`~cntk.ops.functions.Function`
     """
+    rank = len(x.shape)
+    axis = axis % rank
     d = x.shape[axis]
-    u = C.constant(np.triu(np.ones((d, d))).astype(x.dtype))
-    if axis != -1:
-        x = C.swapaxes(x, -1, axis)
-    z = C.times(x, u)
-    if axis != -1:
-        z = C.swapaxes(z, -1, axis)
-    return z
+
+    if d == C.InferredDimension or d == C.FreeDimension:
+        raise ValueError(f"cumsum requires a known dimension along axis {axis}, got {x.shape}")
+
+    def shift(a, offset):
+        """ shifts tensor along axis by offset, filling vacated positions with zeros """
+        pattern = [[0, 0]] * rank
+        if reverse:
+            pattern[axis] = [0, offset]
+            shifted = C.slice(a, axis, offset, d)
+        else:
+            pattern[axis] = [offset, 0]
+            shifted = C.slice(a, axis, 0, d - offset)
+        return C.pad(shifted, pattern)
+
+    @C.BlockFunction('CumSum', name)
+    def inner(a):
+        if d <= scan_threshold:
+            k = 1 if exclusive else 0
+            u = np.tril(np.ones((d, d)), -k) if reverse else np.triu(np.ones((d, d)), k)
+            u = C.constant(u.astype(x.dtype))
+
+            if axis != rank - 1:
+                a = C.swapaxes(a, -1, axis)
+            z = C.times(a, u)
+            if axis != rank - 1:
+                z = C.swapaxes(z, -1, axis)
+            return z
+
+        z = shift(a, 1) if exclusive else a
+        offset = 1
+        while offset < d:
+            z = z + shift(z, offset)
+            offset *= 2
+        return z
+
+    return inner(x)
 
 
-def batchmatmul(left, right, output_rank=1, infer_input_rank_to_map=C.TIMES_NO_INFERRED_INPUT_RANK, name=''):
+def batchmatmul(left, right, output_rank=1, infer_input_rank_to_map=C.TIMES_NO_INFERRED_INPUT_RANK, batch_rank=1,
+                name=''):
     """ Batch Matrix Multiplication
 
     The output of this operation is the matrix product of the two input batch matrices.
 
-    This implementation is similar to tensorflow.matmul.
+    This implementation is similar to tensorflow.matmul and numpy.matmul.
 
-    Currently assumes the first axis to be the static batch axis. Does not accept multiple static batch axis.
+    The first `batch_rank` axes of `left` are its static batch axes. All axes of `right` before its
+    last `output_rank + 1` axes are its static batch axes. Batch axes are broadcast against each other
+    like in numpy, i.e. they are aligned from the right and can be of dimension 1 or missing altogether.
+
+    When one operand has no batch axes (or only batch axes of dimension 1), the product is computed with a
+    single `C.times` without any unpacking or re-sequencing. Otherwise, the batch axes are flattened and folded
+    into a dynamic axis so that all matrices can be multiplied in one batched `C.times`.
 
     Example:
         a = C.sequence.input_variable((3, 4, 5))     # batch matrix
@@ -167,6 +228,18 @@ def batchmatmul(left, right, output_rank=1, infer_input_rank_to_map=C.TIMES_NO_I
         assert c.shape == (3, 4, 6, 7)
 
 
+        a = C.sequence.input_variable((2, 8, 4, 5))  # 2 batch axes
+        b = C.sequence.input_variable((5, 6))        # broadcast matrix
+        c = Cx.batchmatmul(a, b, batch_rank=2)
+        assert c.shape == (2, 8, 4, 6)
+
+
+        a = C.input_variable((2, 1, 4, 5))           # 2 batch axes
+        b = C.input_variable((3, 5, 6))              # 1 batch axis
+        c = Cx.batchmatmul(a, b, batch_rank=2)
+        assert c.shape == (2, 3, 4, 6)               # batch axes broadcast to (2, 3)
+
+
     Arguments:
         left: left side matrix or tensor
         right: right side matrix or tensor
@@ -174,34 +247,87 @@ def batchmatmul(left, right, output_rank=1, infer_input_rank_to_map=C.TIMES_NO_I
             the number of axes to be collapsed in order to transform the tensors
             into matrices, perform the operation and then reshape back (explode the axes)
         infer_input_rank_to_map (int): meant for internal use only. Always use default value
+        batch_rank (int): number of leading static batch axes in `left`
         name (str, optional): the name of the Function instance in the network
 
     Returns:
         :class:`~cntk.ops.functions.Function`
     """
-
-    left_shape = left.shape
-    right_shape = right.shape
+    right_batch_rank = len(right.shape) - output_rank - 1
+    if right_batch_rank < 0:
+        raise ValueError(f"right operand {right.shape} must have at least output_rank + 1 ({output_rank + 1}) axes")
+
+    left_batch, left_matrix = left.shape[:batch_rank], left.shape[batch_rank:]
+    right_batch, right_matrix = right.shape[:right_batch_rank], right.shape[right_batch_rank:]
+
+    # numpy style broadcasting of batch axes, aligned from the right
+    rank = max(len(left_batch), len(right_batch))
+    left_aligned = (1,) * (rank - len(left_batch)) + left_batch
+    right_aligned = (1,) * (rank - len(right_batch)) + right_batch
+
+    batch = []
+    for l, r in zip(left_aligned, right_aligned):
+        if l != r and l != 1 and r != 1:
+            raise ValueError(f"batch axes of left operand {left.shape} and right operand {right.shape} "
+                             f"cannot be broadcast together")
+        batch.append(r if l == 1 else l)
+    batch = tuple(batch)
+
+    # right operand has no batch axes: a single times broadcasts over all leading axes of left
+    if all(d == 1 for d in right_batch):
+        r = C.reshape(right, right_matrix) if right_batch else right
+        result = C.times(left, r, output_rank=output_rank, infer_input_rank_to_map=infer_input_rank_to_map)
+        if rank > len(left_batch):
+            result = C.reshape(result, (1,) * (rank - len(left_batch)) + result.shape)
+        return _inject_name(result, name)
+
+    # left operand has no batch axes: move batch axes of right into its columns and use a single times
+    if all(d == 1 for d in left_batch):
+        rows = len(left_matrix) - 1
+        l = C.reshape(left, left_matrix) if left_batch else left
+
+        # right: (*batch, k, *cols) -> (k, *batch, *cols)
+        perm = [right_batch_rank] + list(range(right_batch_rank)) + list(range(right_batch_rank + 1, len(right.shape)))
+        r = C.transpose(right, perm)
+        result = C.times(l, r, output_rank=right_batch_rank + output_rank,
+                         infer_input_rank_to_map=infer_input_rank_to_map)  # (*rows, *batch, *cols)
+
+        # result: (*rows, *batch, *cols) -> (*batch, *rows, *cols)
+        perm = list(range(rows, rows + right_batch_rank)) + list(range(rows)) + \
+            list(range(rows + right_batch_rank, len(result.shape)))
+        result = C.transpose(result, perm)
+        if rank > len(right_batch):
+            result = C.reshape(result, (1,) * (rank - len(right_batch)) + result.shape)
+        return _inject_name(result, name)
+
+    # both operands have batch axes: materialise broadcast axes, flatten batch axes and fold into a dynamic axis
+    if any(d < 0 for d in batch) and rank > 1:
+        raise ValueError("Free batch axis is only supported with a single static batch axis")
 
     seq_axis_present = len(left.dynamic_axes) == 2
-    static_batch_axis = left_shape[0]  # assumes the first axis to be the static batch axis.
 
-    if left_shape[0] != right_shape[0]:
-        raise ValueError("first axis of left operand and right operand must be the same")
-
-    if (left_shape[0] < 0 or right_shape[0] < 0) and seq_axis_present:
+    if any(d < 0 for d in batch) and seq_axis_present:
         raise ValueError("Static batch axis cannot be a free axis when dynamic sequence axis is also present")
 
+    if left_aligned != batch:
+        left = C.reshape(left, left_aligned + left_matrix) + C.constant(0, shape=batch + left_matrix, dtype=left.dtype)
+
+    if right_aligned != batch:
+        right = C.reshape(right, right_aligned + right_matrix) + C.constant(0, shape=batch + right_matrix,
+                                                                            dtype=right.dtype)
+
+    static_batch_axis = -1 if any(d < 0 for d in batch) else int(np.prod(batch))
+
     # Combine dynamic sequence axis and static batch axis
     if not seq_axis_present:
-        left_unpacked = left
-        right_unpacked = right
+        left_unpacked = C.reshape(left, (static_batch_axis,) + left_matrix) if rank > 1 else left
+        right_unpacked = C.reshape(right, (static_batch_axis,) + right_matrix) if rank > 1 else right
     else:
         left_unpacked = C.sequence.unpack(left, padding_value=0, no_mask_output=True)
         right_unpacked = C.sequence.unpack(right, padding_value=0, no_mask_output=True)
 
-        left_unpacked = C.reshape(left_unpacked, (-1,) + left_shape[1:])
-        right_unpacked = C.reshape(right_unpacked, (-1,) + right_shape[1:])
+        left_unpacked = C.reshape(left_unpacked, (-1,) + left_matrix)
+        right_unpacked = C.reshape(right_unpacked, (-1,) + right_matrix)
 
     # Fold static batch axis into dynamic sequence axis
     left_folded = C.to_sequence(left_unpacked)  # do not set sequence length as batch axis has been folded in
@@ -213,39 +339,80 @@ def batchmatmul(left, right, output_rank=1, infer_input_rank_to_map=C.TIMES_NO_I
     # Split dynamic sequence axis back to original dynamic sequence and static batch axis
     result_unpacked = C.sequence.unpack(result, padding_value=0, no_mask_output=True)
     if not seq_axis_present:
-        result_packed = C.reshape(result_unpacked, (static_batch_axis, ) + result.shape)
+        result_packed = C.reshape(result_unpacked, batch + result.shape)
     else:
-        result_unfolded = C.reshape(result_unpacked, (-1, static_batch_axis) + result.shape)
+        result_unfolded = C.reshape(result_unpacked, (-1,) + batch + result.shape)
         result_packed = C.to_sequence_like(result_unfolded, left)
 
     return _inject_name(result_packed, name)
 
 
-def upsample(x, factor: int):
-    """ Up sample image by a factor of 2 using nearest neighbour.
+def _bilinear_interpolation_matrix(n: int, factor: int):
+    """ (n, n * factor) matrix that linearly interpolates an axis of dimension n, with half-pixel centres """
+    m = np.zeros((n, n * factor), dtype=np.float32)
+    for j in range(n * factor):
+        source = max((j + 0.5) / factor - 0.5, 0)
+        i0 = min(int(np.floor(source)), n - 1)
+        i1 = min(i0 + 1, n - 1)
+        weight = source - i0
+        m[i0, j] += 1 - weight
+        m[i1, j] += weight
+    return m
+
+
+def upsample(x, factor=2, mode: str = 'nearest', name=''):
+    """ Up sample image by a factor using nearest neighbour or bilinear interpolation.
+
+    Nearest neighbour upsampling reshapes every pixel into its own (1, 1) block and broadcasts it to
+    a (row_factor, col_factor) block, so no intermediate larger than the output is created.
+
+    Bilinear upsampling interpolates rows and columns separately with constant interpolation matrices
+    (half-pixel centres, same as `align_corners=False` in other frameworks). Spatial dimensions must be known.
 
     Example:
-        a = C.input_variable((3, 32, 32)
-        b = UpSampling2D(a)
+        a = C.input_variable((3, 32, 32))
+        b = Cx.upsample(a)
+        c = Cx.upsample(a, factor=(2, 4), mode='bilinear')
 
         assert b.shape == (3, 64, 64)
+        assert c.shape == (3, 64, 128)
 
     Arguments:
         x: input image tensor, assumed (channel, row, col)
+        factor (int or tuple): upsampling factor, or (row factor, col factor)
+        mode (str): 'nearest' or 'bilinear'
+        name (str, optional): the name of the Function instance in the network
 
     Returns:
         :class:`~cntk.ops.functions.Function`
 
     """
-    # old implementation for upsample by factor 2
-    # xr = C.reshape(x, (x.shape[0], x.shape[1], 1, x.shape[2], 1))
-    # xx = C.splice(xr, xr, axis=-1)  # axis=-1 refers to the last axis
-    # xy = C.splice(xx, xx, axis=-3)  # axis=-3 refers to the middle axis
-    # r = C.reshape(xy, (x.shape[0], x.shape[1] * 2, x.shape[2] * 2))
+    row_factor, col_factor = factor if isinstance(factor, tuple) else (factor, factor)
+    channel, row, col = x.shape
+
+    if mode not in ('nearest', 'bilinear'):
+        raise ValueError(f"mode must be either 'nearest' or 'bilinear' but got '{mode}'")
+
+    if mode == 'nearest':
+
+        @C.BlockFunction('UpsampleNearest', name)
+        def inner(a):
+            ones = C.constant(1, shape=(1, 1, row_factor, 1, col_factor), dtype=x.dtype)
+            blocks = C.reshape(a, (channel, row, 1, col, 1)) * ones  # [channel, row, row_factor, col, col_factor]
+            return C.reshape(blocks, (channel, row * row_factor, col * col_factor))
+
+    else:
 
-    xx = C.splice(*[x for __ in range(factor * 2)], axis=0)
-    r = C.depth_to_space(xx, factor)
-    return r
+        @C.BlockFunction('UpsampleBilinear', name)
+        def inner(a):
+            row_interpolation = C.constant(_bilinear_interpolation_matrix(row, row_factor).astype(x.dtype))
+            col_interpolation = C.constant(_bilinear_interpolation_matrix(col, col_factor).astype(x.dtype))
+
+            b = C.times(a, col_interpolation)  # [channel, row, col * col_factor]
+            b = C.times(C.swapaxes(b, 1, 2), row_interpolation)  # [channel, col * col_factor, row * row_factor]
+            return C.swapaxes(b, 1, 2)
+
+    return inner(x)
 
 
 def centre_crop(larger_image, smaller_image, name: str = ''):
@@ -289,17 +456,132 @@ def centre_crop_and_splice(larger_image, smaller_image):
     return C.splice(smaller_image, centre_crop(larger_image, smaller_image), axis=0)
 
 
+##########################################################################
+# fused activations
+##########################################################################
+def _apply(f, *arrays):
+    """ applies numpy kernel f on arrays, or on every sequence when arrays are lists of variable length sequences """
+    if isinstance(arrays[0], list):
+        return [f(*a) for a in zip(*arrays)]
+    return f(*arrays)
+
+
+def _erf_numpy(x):
+    """ A&S formula 7.1.26, same approximation as `erf` """
+    a1, a2, a3, a4, a5, p = 0.254829592, -0.284496736, 1.421413741, -1.453152027, 1.061405429, 0.3275911
+
+    t = 1.0 / (1.0 + p * np.abs(x))
+    y = 1.0 - (((((a5 * t + a4) * t) + a3) * t + a2) * t + a1) * t * np.exp(-x * x)
+    return (np.sign(x) * y).astype(x.dtype)
+
+
+def _sigmoid_numpy(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1)
+
+
+class _FusedActivation(UserFunction, metaclass=ABCMeta):
+    """ element-wise activation as a single forward/backward node evaluated with vectorised numpy kernels
+
+    Only the input is retained for the backward pass, instead of every intermediate of the BlockFunction.
+    Subclasses implement `function` and `derivative`.
+    """
+    def __init__(self, arg, name=''):
+        super(_FusedActivation, self).__init__([arg], name=name)
+
+    @staticmethod
+    @abstractmethod
+    def function(x):
+        """ activation of a numpy array """
+
+    @staticmethod
+    @abstractmethod
+    def derivative(x):
+        """ derivative of the activation with respect to its input, for a numpy array """
+
+    def forward(self, argument, device=None, outputs_to_retain=None):
+        return argument, _apply(self.function, argument)
+
+    def backward(self, state, root_gradients):
+        return _apply(lambda x, g: g * self.derivative(x), state, root_gradients)
+
+    def infer_outputs(self):
+        return [C.output_variable(self.inputs[0].shape, self.inputs[0].dtype, self.inputs[0].dynamic_axes)]
+
+    @classmethod
+    def deserialize(cls, inputs, name, state):
+        return cls(inputs[0], name)
+
+
+class _FusedSwish(_FusedActivation):
+
+    @staticmethod
+    def function(x):
+        return x * _sigmoid_numpy(x)
+
+    @staticmethod
+    def derivative(x):
+        s = _sigmoid_numpy(x)
+        return s + x * s * (1 - s)
+
+
+class _FusedMish(_FusedActivation):
+
+    @staticmethod
+    def function(x):
+        return x * np.tanh(np.logaddexp(0, x))
+
+    @staticmethod
+    def derivative(x):
+        t = np.tanh(np.logaddexp(0, x))
+        return t + x * (1 - t * t) * _sigmoid_numpy(x)
+
+
+class _FusedErf(_FusedActivation):
+
+    @staticmethod
+    def function(x):
+        return _erf_numpy(x)
+
+    @staticmethod
+    def derivative(x):
+        return (2 / np.sqrt(np.pi) * np.exp(-x * x)).astype(x.dtype)
+
+
+class _FusedGelu(_FusedActivation):
+
+    @staticmethod
+    def function(x):
+        return 0.5 * x * (1 + _erf_numpy(x / 1.41421356237))
+
+    @staticmethod
+    def derivative(x):
+        cdf = 0.5 * (1 + _erf_numpy(x / 1.41421356237))
+        pdf = np.exp(-0.5 * x * x) / np.sqrt(2 * np.pi)
+        return (cdf + x * pdf).astype(x.dtype)
+
+
 ##########################################################################
 # non linear and nn ops
 ##########################################################################
 @C.typemap
-def swish(x, name=''):
+def swish(x, fused: bool = False, name=''):
     """ swish activation function first introduced in 'Searching for activation function' by Prajit et al.
     Paper can be found in https://arxiv.org/abs/1710.05941 and https://arxiv.org/abs/1901.02671
 
     It typically exhibits good performance in a variety of task in vision and nlp problems.
     Can be used as a drop-in replace for relu.
+
+    Arguments:
+        x: input_tensor
+        fused (bool): use a single forward/backward user function node with numpy kernels (cpu only)
+        name (str, optional): the name of the Function instance in the network
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`:
+
     """
+    if fused:
+        return C.user_function(_FusedSwish(x, name=name))
 
     @C.BlockFunction('Swish', name=name)
     def inner(a):
@@ -309,7 +591,7 @@ def swish(x, name=''):
 
 
 @C.typemap
-def mish(x, name=''):
+def mish(x, fused: bool = False, name=''):
     """ Mish activation function is introduced in 'Mish: A Self Regularized Non-Monotonic Neural Activation Function'
     by Diganta Misra.
 
@@ -329,7 +611,19 @@ def mish(x, name=''):
         based on testing, the additional computation complexity is minimal.
 
     For more detail, the paper can be found here 'https://arxiv.org/abs/1908.08681v2'
+
+    Arguments:
+        x: input_tensor
+        fused (bool): use a single forward/backward user function node with numpy kernels (cpu only)
+        name (str, optional): the name of the Function instance in the network
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`:
+
     """
+    if fused:
+        return C.user_function(_FusedMish(x, name=name))
+
     @C.BlockFunction('Mish', name=name)
     def inner(a):
         return a * C.tanh(C.softplus(a))
@@ -361,7 +655,7 @@ def hardmax(x, axis=-1, name=''):
     return inner(x)
 
 
-def erf(x, name=''):
+def erf(x, fused: bool = False, name=''):
     """
     Computes the element-wise error function of `x`:
 
@@ -371,7 +665,17 @@ def erf(x, name=''):
     has error less than 1.5 * 10-7 for all inputs.
     book can be found here 'http://people.math.sfu.ca/~cbm/aands/frameindex.htm'
 
+    Arguments:
+        x: input_tensor
+        fused (bool): use a single forward/backward user function node with numpy kernels (cpu only)
+        name (str, optional): the name of the Function instance in the network
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`:
+
     """
+    if fused:
+        return C.user_function(_FusedErf(x, name=name))
 
     # constants
     a1 = 0.254829592
@@ -389,14 +693,14 @@ def erf(x, name=''):
         abs_x = C.abs(a)
 
         # A&S formula 7.1.26
-        t = 1.0 / (1.0 + p * a)
+        t = 1.0 / (1.0 + p * abs_x)
         y = 1.0 - (((((a5 * t + a4) * t) + a3) * t + a2) * t + a1) * t * C.exp(-abs_x * abs_x)
         return C.element_times(sign, y)
 
     return inner(x)
 
 
-def gelu(x, name=''):
+def gelu(x, fused: bool = False, name=''):
     """ Gaussian Error Linear Unit (GELU), a high-performing neuralnetwork activation function.
     The GELU nonlinearity is the expected transforma-tion of a stochastic regularizer which randomly
     applies the identity or zero mapto a neuron’s input.  The GELU nonlinearity weights inputs by their
@@ -411,12 +715,16 @@ def gelu(x, name=''):
 
     Arguments:
         x: input_tensor
+        fused (bool): use a single forward/backward user function node with numpy kernels (cpu only)
         name (str, optional): the name of the Function instance in the network
 
     Returns:
         :class:`~cntk.ops.functions.Function`:
 
     """
+    if fused:
+        return C.user_function(_FusedGelu(x, name=name))
+
     @C.BlockFunction('Gelu', name=name)
     def inner(a):
         return 0.5 * a * (1 + erf(a / 1.41421356237))
@@ -445,7 +753,18 @@ def gelu_fast(x, name=''):
     return inner(x)
 
 
-def scaled_dot_product_attention(query, key, value, obey_sequence_order: bool = None, max_seq_len: int = None, name=''):
+def _query_key_segment_ids(segment_ids):
+    """ segment ids of self-attention are shared by query and key """
+    if isinstance(segment_ids, (tuple, list)):
+        if len(segment_ids) != 2:
+            raise ValueError("segment_ids must be a tensor or a tuple of (query_segment_ids, key_segment_ids)")
+        return tuple(segment_ids)
+
+    return segment_ids, segment_ids
+
+
+def scaled_dot_product_attention(query, key, value, obey_sequence_order: bool = None, max_seq_len: int = None,
+                                 segment_ids=None, name=''):
     """
     Scaled dot-product attention implementation of "Attention is all you need", https://arxiv.org/abs/1706.03762
 
@@ -469,7 +788,10 @@ def scaled_dot_product_attention(query, key, value, obey_sequence_order: bool =
         assert b.shape == (10, )
 
         obey_sequence_order: do not let attention peek into future values
-        max_seq_len: max sequence length possible, used to ensure that sequence order is obeyed
+        max_seq_len: deprecated and unused. Causal mask is computed from sequence positions
+        segment_ids: for packed sequences, queries only attend to keys of the same segment. Either a sequence
+          tensor of shape (1, ) shared by query and key (self-attention) or a tuple of
+          (query_segment_ids, key_segment_ids). Segment ids must be non-negative.
 
     Returns:
         :class:`~cntk.ops.functions.Function`:
@@ -477,8 +799,7 @@ def scaled_dot_product_attention(query, key, value, obey_sequence_order: bool =
 
     """
 
-    @C.BlockFunction('ScaledDotProductAttention', name)
-    def attention(query, key, value):
+    def attend(query, key, value, query_ids=None, key_ids=None):
         dk = C.sqrt(C.reduce_sum(C.ones_like(query)))  # cannot use sequence.last, will conflict with recurrence
         # dk: [#, *] [1, ] and value = int(dim_of_query)
 
@@ -491,25 +812,259 @@ def scaled_dot_product_attention(query, key, value, obey_sequence_order: bool =
         # scaled: [#, *] [-3, ] => for every key seq element, there is a corresponding score
 
         # masked out invalid temporal connections to obey_sequence_order
-        if obey_sequence_order and max_seq_len:
-            unpacked_scaled, scaled_mask = C.sequence.unpack(scaled, padding_value=0).outputs
-            # unpacked_scaled: [#] [-3, -3]  <== matrix will be top right diagonally zero-ed
-            # scaled_mask: [#] [-3,]
+        if obey_sequence_order:
+            query_position = sequence.position(query)  # [#, *] [1, ]
+            key_position = C.sequence.unpack(sequence.position(key), padding_value=1e+30, no_mask_output=True)
+            key_position = C.sequence.broadcast_as(C.squeeze(key_position, axes=-1), query)  # [#, *] [-3, ]
+
+            valid_connections = C.less_equal(key_position, query_position)  # [#, *] [-3, ]
+            scaled = C.element_select(valid_connections, scaled, C.constant(-1e+30))  # [#, *] [-3, ]
 
-            minus_inf = C.constant(-1e+30)
-            valid_connections = C.Constant(np.tril(np.ones((max_seq_len, max_seq_len)), k=0))  # [] [max_seq, max_seq]
-            valid_connections = C.reconcile_dynamic_axes(valid_connections, unpacked_scaled)  # [#] [max_seq, max_seq]
-            valid_connections = C.crop_manual(valid_connections, unpacked_scaled, 0, 0)  # [#] [-3, -3]
-            unpacked_scaled = C.element_select(valid_connections, unpacked_scaled, minus_inf)  # [#] [-3, -3]
-            scaled = C.to_sequence_like(unpacked_scaled, query)  # [#, *] [-3]
+        # masked out connections between different segments of packed sequences
+        if query_ids is not None:
+            unpacked_key_ids = C.sequence.unpack(key_ids, padding_value=-1, no_mask_output=True)  # [#] [-3, 1]
+            unpacked_key_ids = C.sequence.broadcast_as(C.squeeze(unpacked_key_ids, axes=-1), query)  # [#, *] [-3, ]
 
-        elif obey_sequence_order and not max_seq_len:
-            raise ValueError("max_seq_len must be defined when obey_sequence_order is True")
+            same_segment = C.equal(unpacked_key_ids, query_ids)  # [#, *] [-3, ]
+            scaled = C.element_select(same_segment, scaled, C.constant(-1e+30))  # [#, *] [-3, ]
 
         attended = C.times(C.softmax(scaled, axis=-1), C.sequence.broadcast_as(unpacked_value, query))  # [#, *] [value_dim,]
         return attended
 
-    return attention(query, key, value)
+    if segment_ids is None:
+        @C.BlockFunction('ScaledDotProductAttention', name)
+        def attention(query, key, value):
+            return attend(query, key, value)
+
+        return attention(query, key, value)
+
+    @C.BlockFunction('ScaledDotProductAttention', name)
+    def segmented_attention(query, key, value, query_ids, key_ids):
+        return attend(query, key, value, query_ids, key_ids)
+
+    return segmented_attention(query, key, value, *_query_key_segment_ids(segment_ids))
+
+
+def multi_head_scaled_dot_product_attention(query, key, value, num_heads: int, obey_sequence_order: bool = None,
+                                            max_seq_len: int = None, segment_ids=None, name=''):
+    """
+    Head-batched scaled dot-product attention as used in multi-head attention of "Attention is all you need",
+    https://arxiv.org/abs/1706.03762
+
+    The last axis of query, key and value is split into `num_heads` heads. Instead of building one
+    attention subgraph per head, the head axis is folded into a dynamic axis so that all heads are computed with
+    a single batched matrix multiplication, a single softmax and a single unpack of key and value.
+
+    Result is the same as splicing the results of `scaled_dot_product_attention` applied on every head,
+    except that padded key positions are masked out of the softmax.
+
+    Note:
+        Query and key must have the same dimension
+        Key and value must have the same sequence length
+        Query is unpacked, so this op cannot be used inside a recurrence loop that steps over the query sequence.
+        Use `scaled_dot_product_attention` on every head for that.
+
+    Example:
+        a = C.sequence.input_variable(32)
+        b = Cx.multi_head_scaled_dot_product_attention(a, a, a, num_heads=4)
+
+        assert b.shape == (32, )
+
+    Arguments:
+        query: sequence tensor of shape (num_heads * head_dim, )
+        key: sequence tensor of shape (num_heads * head_dim, )
+        value: sequence tensor of shape (num_heads * value_head_dim, )
+        num_heads (int): number of attention heads
+        obey_sequence_order: do not let attention peek into future values
+        max_seq_len: deprecated and unused. Causal mask is computed from sequence positions
+        segment_ids: for packed sequences, queries only attend to keys of the same segment. Either a sequence
+          tensor of shape (1, ) shared by query and key (self-attention) or a tuple of
+          (query_segment_ids, key_segment_ids). Segment ids must be non-negative.
+        name (str, optional): the name of the Function instance in the network
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`:
+        A function that returns a weighted sum of value
+
+    """
+    if query.shape[-1] % num_heads or value.shape[-1] % num_heads:
+        raise ValueError(f"last axis of query {query.shape} and value {value.shape} must be divisible by {num_heads}")
+
+    head_dim = query.shape[-1] // num_heads
+    value_head_dim = value.shape[-1] // num_heads
+
+    def fold_heads(unpacked, dim):
+        """ [#] [*=L, num_heads * dim] -> [#] [num_heads, *=L, dim] """
+        return C.swapaxes(C.reshape(unpacked, (num_heads, dim), begin_axis=1), 0, 1)
+
+    def attend(q, k, v, query_ids=None, key_ids=None):
+        unpacked_query = C.sequence.unpack(q, padding_value=0, no_mask_output=True)  # [#] [*=q, dim]
+        unpacked_key, key_mask = C.sequence.unpack(k, padding_value=0).outputs  # [#] [*=k, dim], [#] [*=k]
+        unpacked_value = C.sequence.unpack(v, padding_value=0, no_mask_output=True)  # [#] [*=k, value_dim]
+
+        # fold head axis into a dynamic axis so that all heads are multiplied in one batched times
+        folded_query = C.to_sequence(fold_heads(unpacked_query, head_dim))  # [#, heads] [*=q, head_dim]
+        folded_key = C.to_sequence_like(fold_heads(unpacked_key, head_dim), folded_query)  # [#, heads] [*=k, head_dim]
+        folded_value = C.to_sequence_like(fold_heads(unpacked_value, value_head_dim), folded_query)
+
+        scaled = C.times_transpose(folded_query, folded_key) / head_dim ** 0.5
+        # scaled: [#, heads] [*=q, *=k]
+
+        minus_inf = C.constant(-1e+30)
+        valid_keys = C.sequence.broadcast_as(C.expand_dims(key_mask, axis=0), folded_query)  # [#, heads] [1, *=k]
+        scaled = C.element_select(valid_keys, scaled, minus_inf)
+
+        # masked out invalid temporal connections to obey_sequence_order
+        if obey_sequence_order:
+            query_position = C.sequence.unpack(sequence.position(q), padding_value=0, no_mask_output=True)
+            key_position = C.sequence.unpack(sequence.position(k), padding_value=0, no_mask_output=True)
+            query_position = C.sequence.broadcast_as(query_position, folded_query)  # [#, heads] [*=q, 1]
+            key_position = C.sequence.broadcast_as(C.swapaxes(key_position, 0, 1), folded_query)  # [#, heads] [1, *=k]
+
+            valid_connections = C.less_equal(key_position, query_position)  # [#, heads] [*=q, *=k]
+            scaled = C.element_select(valid_connections, scaled, minus_inf)
+
+        # masked out connections between different segments of packed sequences
+        if query_ids is not None:
+            unpacked_query_ids = C.sequence.unpack(query_ids, padding_value=-1, no_mask_output=True)  # [#] [*=q, 1]
+            unpacked_key_ids = C.sequence.unpack(key_ids, padding_value=-1, no_mask_output=True)  # [#] [*=k, 1]
+            unpacked_query_ids = C.sequence.broadcast_as(unpacked_query_ids, folded_query)  # [#, heads] [*=q, 1]
+            unpacked_key_ids = C.sequence.broadcast_as(C.swapaxes(unpacked_key_ids, 0, 1), folded_query)  # [#, heads] [1, *=k]
+
+            same_segment = C.equal(unpacked_key_ids, unpacked_query_ids)  # [#, heads] [*=q, *=k]
+            scaled = C.element_select(same_segment, scaled, minus_inf)
+
+        attended = C.times(C.softmax(scaled, axis=-1), folded_value)  # [#, heads] [*=q, value_head_dim]
+
+        unfolded = C.sequence.unpack(attended, padding_value=0, no_mask_output=True)  # [#] [heads, *=q, value_head_dim]
+        unfolded = C.reshape(C.swapaxes(unfolded, 0, 1), (num_heads * value_head_dim,), begin_axis=1)  # [#] [*=q, value_dim]
+        return C.to_sequence_like(unfolded, q)  # [#, *=q] [value_dim]
+
+    if segment_ids is None:
+        @C.BlockFunction('MultiHeadScaledDotProductAttention', name)
+        def attention(q, k, v):
+            return attend(q, k, v)
+
+        return attention(query, key, value)
+
+    @C.BlockFunction('MultiHeadScaledDotProductAttention', name)
+    def segmented_attention(q, k, v, query_ids, key_ids):
+        return attend(q, k, v, query_ids, key_ids)
+
+    return segmented_attention(query, key, value, *_query_key_segment_ids(segment_ids))
+
+
+def tiled_scaled_dot_product_attention(query, key, value, block_size: int = 256, obey_sequence_order: bool = None,
+                                       segment_ids=None, name=''):
+    """
+    Block-wise scaled dot-product attention using online softmax.
+
+    Keys and values are processed in blocks of `block_size` sequence items. For every block, the scores of all
+    queries are computed and merged into a running maximum, running normaliser and running weighted sum of values,
+    which are folded over the key blocks. Result is the same as `scaled_dot_product_attention`, except that padded
+    key positions are masked out of the softmax.
+
+    This does not reduce memory. CNTK keeps the [query_len x block_size] scores of every block for the whole block
+    sequence, which adds up to the full [query_len x key_len] score matrix, and the query is copied to every block,
+    i.e. query_len x dim x key_len / block_size values. Use `scaled_dot_product_attention` unless the block-wise
+    evaluation order itself is needed.
+
+    For more details refer to "Online normalizer calculation for softmax" by Milakov and Gimelshein,
+    https://arxiv.org/abs/1805.02867
+
+    Note:
+        Query and key must have the same dimension
+        Key and value must have the same sequence length
+        Query is unpacked, so this op cannot be used inside a recurrence loop that steps over the query sequence.
+
+    Example:
+        a = C.sequence.input_variable(10)
+        b = Cx.tiled_scaled_dot_product_attention(a, a, a, block_size=64)
+
+        assert b.shape == (10, )
+
+    Arguments:
+        query: sequence tensor
+        key: sequence tensor
+        value: sequence tensor
+        block_size (int): number of key sequence items processed at a time
+        obey_sequence_order: do not let attention peek into future values
+        segment_ids: for packed sequences, queries only attend to keys of the same segment. Either a sequence
+          tensor of shape (1, ) shared by query and key (self-attention) or a tuple of
+          (query_segment_ids, key_segment_ids). Segment ids must be non-negative.
+        name (str, optional): the name of the Function instance in the network
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`:
+        A function that returns a weighted sum of value
+
+    """
+    key_dim = key.shape[-1]
+    value_dim = value.shape[-1]
+    scale = 1 / query.shape[-1] ** 0.5
+    minus_inf = -1e+30
+
+    def attend(q, k, v, query_ids=None, key_ids=None):
+        unpacked_query = C.sequence.unpack(q, padding_value=0, no_mask_output=True)  # [#] [*=q, dim]
+        query_position = C.sequence.unpack(sequence.position(q), padding_value=0, no_mask_output=True)  # [#] [*=q, 1]
+
+        # position is offset by one so that zero marks the padding in the last block
+        key_position = sequence.position(k) + 1
+        key_columns = [k, v, key_position] if query_ids is None else [k, v, key_position, key_ids]
+        blocks = sequence.window(C.splice(*key_columns), block_size, block_size, new_axis=True)
+        # blocks: [#, *=k / block_size] [block_size, key_dim + value_dim + 1 (+ 1 with segment ids)]
+
+        if query_ids is not None:
+            unpacked_query_ids = C.sequence.unpack(query_ids, padding_value=-1, no_mask_output=True)  # [#] [*=q, 1]
+
+        @C.Function
+        def merge_block(m, l, acc, block):
+            key_block = C.slice(block, -1, 0, key_dim)  # [#, *] [block_size, key_dim]
+            value_block = C.slice(block, -1, key_dim, key_dim + value_dim)  # [#, *] [block_size, value_dim]
+            position_block = C.swapaxes(C.slice(block, -1, key_dim + value_dim, key_dim + value_dim + 1))
+            # position_block: [#, *] [1, block_size]
+
+            scores = C.times_transpose(C.sequence.broadcast_as(unpacked_query, block), key_block) * scale
+            # scores: [#, *] [*=q, block_size]
+
+            valid = C.greater(position_block, 0)
+            if obey_sequence_order:
+                valid = valid * C.less_equal(position_block - 1, C.sequence.broadcast_as(query_position, block))
+
+            if query_ids is not None:
+                segment_block = C.swapaxes(C.slice(block, -1, key_dim + value_dim + 1, key_dim + value_dim + 2))
+                valid = valid * C.equal(segment_block, C.sequence.broadcast_as(unpacked_query_ids, block))
+
+            scores = C.element_select(valid, scores, minus_inf)
+
+            m_new = C.element_max(m, C.reduce_max(scores, axis=-1))  # [#, *] [*=q, 1]
+            p = C.exp(scores - m_new) * valid  # [#, *] [*=q, block_size]
+            correction = C.exp(m - m_new)  # rescales previous blocks to the new running maximum
+
+            l_new = l * correction + C.reduce_sum(p, axis=-1)  # [#, *] [*=q, 1]
+            acc_new = acc * correction + C.times(p, value_block)  # [#, *] [*=q, value_dim]
+            return m_new, l_new, acc_new
+
+        # the running accumulators are a fixed size state and only the state after the last block is emitted
+        __, l, acc = C.layers.Fold(merge_block, initial_state=(minus_inf, 0, 0), return_full_state=True)(blocks).outputs
+        # l: [#] [*=q, 1], acc: [#] [*=q, value_dim]
+
+        # padded queries of packed sequences have no valid key, guard against 0 / 0
+        attended = acc / C.element_max(l, 1e-30)  # [#] [*=q, value_dim]
+        return C.to_sequence_like(attended, q)  # [#, *=q] [value_dim]
+
+    if segment_ids is None:
+        @C.BlockFunction('TiledScaledDotProductAttention', name)
+        def attention(q, k, v):
+            return attend(q, k, v)
+
+        return attention(query, key, value)
+
+    @C.BlockFunction('TiledScaledDotProductAttention', name)
+    def segmented_attention(q, k, v, query_ids, key_ids):
+        return attend(q, k, v, query_ids, key_ids)
+
+    return segmented_attention(query, key, value, *_query_key_segment_ids(segment_ids))
 
 
 ##########################################################################
@@ -1,4 +1,5 @@
 import cntk as C
+import cntkx as Cx
 
 
 def sample(x, axis=-1, name=''):
@@ -48,15 +49,30 @@ def sample_with_bias(x, axis: int = -1, bias: float = 0.5, name=''):
     return inner(x)
 
 
-def sample_top_k(x, k, num_classes, axis=-1, name=''):
+def _top_k_logits(a, k: int, axis: int):
+    """ keeps the k largest logits along axis and sets everything else to -inf, without materialising a one-hot """
+    k_values = C.top_k(a, k=k, axis=axis).outputs[0]
+    # k_values: [#, *] [static_axes, k] sorted in descending order
+
+    kth_largest = C.slice(k_values, axis, k - 1, k)
+    # kth_largest: [#, *] [static_axes, 1]
+
+    minus_inf = C.constant(-1e+30)
+    return C.element_select(C.greater_equal(a, kth_largest), a, minus_inf)
+
+
+def sample_top_k(x, k, num_classes=None, axis=-1, name=''):
     """ Sample once from the top_k unnormalised log-prob distribution of `x` and returns a one hot encoded vector.
 
+    Logits smaller than the k-th largest logit are masked out before sampling, so memory is O(num_classes).
+    If several logits tie with the k-th largest logit, all of them can be sampled.
+
     Example:
         import cntk as C
         import cntkx as Cx
 
         a = C.input_variable(5)
-        b = Cx.random.sample_top_k(a, k=3, num_classes=5)
+        b = Cx.random.sample_top_k(a, k=3)
 
         n = np.array([[1, 2, 3, 4, 5],] * 1000)
 
@@ -68,7 +84,7 @@ def sample_top_k(x, k, num_classes, axis=-1, name=''):
     Arguments:
         x: input tensor
         k (int): number of k largest probability to sample from
-        num_classes (int): typically the dimension of `x`
+        num_classes (int): deprecated and unused, kept for backward compatibility
         axis (int): axis along which to perform the operation (default: -1)
         name (str): the name of the Function instance in the network
 
@@ -80,25 +96,104 @@ def sample_top_k(x, k, num_classes, axis=-1, name=''):
     @C.BlockFunction('Random::SampleTopK', name=name)
     def inner(a):
         # a: [#, *] [static_axes, num_classes]
+        # k largest probabilities are retained, everything else is set to -inf and will not be sampled
+        e = _top_k_logits(a, k, axis)
 
-        k_values, k_indices = C.top_k(a, k=k, axis=axis).outputs
-        # k_indices [#, *] [static_axes, k]
+        # sample from top_k distribution once
+        s = sample(e, axis=axis)
+        # s: [#, *] [static_axes, num_classes]
+        return s
 
-        b = C.one_hot(k_indices, num_classes)
-        # b: [#, *] [static_axes, k, num_classes]
+    return inner(x)
+
+
+def sample_top_k_batch(x, k, num_samples: int, axis=-1, name=''):
+    """ Draws `num_samples` independent samples from the top_k unnormalised log-prob distribution of `x` at once
+    and returns them as one hot encoded vectors stacked on a new leading axis.
+
+    The top_k mask is computed once and shared by all samples, which is useful for generating many candidates
+    (e.g. beams or parallel generations) per position in a single `eval` call.
+
+    Example:
+        a = C.input_variable(5)
+        b = Cx.random.sample_top_k_batch(a, k=3, num_samples=8)
 
-        valid_probabilities = C.squeeze(C.reduce_sum(b, axis=-2), axes=(-2,))
-        # valid_probabilities: [#, *] [static_axes, num_classes]
+        assert b.shape == (8, 5)
 
-        # k largest probabilies are retained, everything else is set to -inf and will not be sampled
-        minus_inf = C.constant(-1e+30)
-        d = a * valid_probabilities
-        e = C.element_select(d, d, minus_inf)
+    Arguments:
+        x: input tensor
+        k (int): number of k largest probability to sample from
+        num_samples (int): number of independent samples drawn from every distribution
+        axis (int): axis along which to perform the operation (default: -1)
+        name (str): the name of the Function instance in the network
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`
+
+    """
+    rank = len(x.shape)
+    sample_axis = axis if axis < 0 else axis + 1
+
+    @C.BlockFunction('Random::SampleTopKBatch', name=name)
+    def inner(a):
+        e = _top_k_logits(a, k, axis)
         # e: [#, *] [static_axes, num_classes]
 
-        # sample from top_k distribution once
-        s = sample(e, axis=axis, name=name)
-        # s: [#, *] [static_axes, num_classes]
-        return s
+        ones = C.constant(1, shape=(num_samples, ) + (1, ) * rank)
+        samples = C.reshape(e, (1, ) + x.shape) * ones
+        # samples: [#, *] [num_samples, static_axes, num_classes]
+
+        return sample(samples, axis=sample_axis)
 
     return inner(x)
+
+
+def sample_top_p(x, p: float, axis=-1, name=''):
+    """ Nucleus sampling. Sample once from the smallest set of classes whose cumulative probability exceeds `p`
+    and returns a one hot encoded vector.
+
+    Logits are sorted and accumulated on-graph, so the whole sampling step is vectorised over batch and sequence
+    axes and stays inside a single `eval` call. The most probable class is always retained.
+
+    Example:
+        a = C.input_variable(5)
+        b = Cx.random.sample_top_p(a, p=0.9)
+
+        n = np.log(np.array([[0.05, 0.05, 0.1, 0.3, 0.5],] * 1000))
+
+        results = b.eval({a: n})
+        assert np.sum(results[:, :2]) == 0
+
+    Arguments:
+        x: input tensor (not softmax-ed)
+        p (float): cumulative probability of the classes to sample from, between 0 and 1
+        axis (int): axis along which to perform the operation (default: -1)
+        name (str): the name of the Function instance in the network
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`
+
+    """
+    if not 0 < p <= 1:
+        raise ValueError(f"p must be in the range (0, 1] but got {p}")
+
+    num_classes = x.shape[axis]
+
+    # the block is built on a placeholder with the static shape of x, so that cumsum can size its constant
+    a = C.placeholder(shape=x.shape, dynamic_axes=x.dynamic_axes)
+
+    # a: [#, *] [static_axes, num_classes]
+    sorted_logits = C.top_k(a, k=num_classes, axis=axis).outputs[0]
+    # sorted_logits: [#, *] [static_axes, num_classes] in descending order
+
+    probability_before = Cx.cumsum(C.softmax(sorted_logits, axis=axis), axis=axis, exclusive=True)
+    nucleus = C.less(probability_before, p)
+    # nucleus: [#, *] [static_axes, num_classes], 1 for classes that are required to reach p
+
+    plus_inf = C.constant(1e+30)
+    threshold = C.reduce_min(C.element_select(nucleus, sorted_logits, plus_inf), axis=axis)
+    # threshold: [#, *] [static_axes, 1], smallest logit within the nucleus
+
+    minus_inf = C.constant(-1e+30)
+    e = C.element_select(C.greater_equal(a, threshold), a, minus_inf)
+    return C.as_block(sample(e, axis=axis), [(a, x)], 'Random::SampleTopP', name)
@@ -1,4 +1,4 @@
-from cntkx.ops.random import sample_top_k, sample
+from cntkx.ops.random import sample_top_k, sample, sample_top_k_batch, sample_top_p
 import numpy as np
 import cntk as C
 
@@ -58,3 +58,60 @@ def test_top_k_sample():
     results = b.eval({a: n})
     assert np.sum(results[:, :, :2]) == 0
     assert np.sum(results[:, :, 2:]) == 1000 * 10
+
+
+def test_top_k_sample_threshold():
+    """ zero and negative logits within the top k can still be sampled """
+    a = C.input_variable(6)
+    b = sample_top_k(a, k=3)
+
+    n = np.array([[-5, -1, 0, -3, -0.5, -10], ] * 1000).astype(np.float32)
+
+    results = b.eval({a: n})
+    assert np.sum(results[:, [0, 3, 5]]) == 0
+    assert np.sum(results[:, [1, 2, 4]]) == 1000
+    assert np.all(np.sum(results[:, [1, 2, 4]], axis=0) > 0)
+
+
+def test_top_k_sample_batch():
+    a = C.input_variable(5)
+    b = sample_top_k_batch(a, k=2, num_samples=50)
+
+    assert b.shape == (50, 5)
+
+    n = np.array([[1, 2, 3, 4, 5], ] * 100).astype(np.float32)
+
+    results = b.eval({a: n})
+    assert results.shape == (100, 50, 5)
+    assert np.sum(results[..., :3]) == 0
+    assert np.sum(results[..., 3:]) == 100 * 50
+    np.testing.assert_equal(np.sum(results, axis=-1), 1)
+
+
+def test_top_p_sample():
+    a = C.input_variable(5)
+    b = sample_top_p(a, p=0.75)
+
+    n = np.log(np.array([[0.3, 0.05, 0.5, 0.1, 0.05], ] * 1000)).astype(np.float32)
+
+    results = b.eval({a: n})
+    assert np.sum(results[:, [1, 3, 4]]) == 0
+    assert np.sum(results[:, [0, 2]]) == 1000
+    assert np.all(np.sum(results[:, [0, 2]], axis=0) > 0)
+
+    # most probable class is always retained
+    b = sample_top_p(a, p=0.1)
+    results = b.eval({a: n})
+    np.testing.assert_equal(np.sum(results, axis=0), np.array([0, 0, 1000, 0, 0]))
+
+    # vectorised over sequence axis
+    a = C.sequence.input_variable(5)
+    b = sample_top_p(a, p=0.75)
+
+    n = [np.log(np.array([[0.3, 0.05, 0.5, 0.1, 0.05], ] * 7)).astype(np.float32),
+         np.log(np.array([[0.05, 0.6, 0.05, 0.2, 0.1], ] * 3)).astype(np.float32)]
+
+    results = b.eval({a: n})
+    assert np.sum(results[0][:, [1, 3, 4]]) == 0
+    assert np.sum(results[1][:, [0, 2, 4]]) == 0
+    assert results[0].shape == (7, 5)
@@ -1,5 +1,6 @@
 import cntk as C
 import cntkx as Cx
+from collections import OrderedDict
 from math import pi
 from typing import Tuple
 
@@ -25,12 +26,8 @@ def pad(x, pattern: Tuple[int, int], constant_value: float = 0, name=''):
         if constant_value:
             paddings = [padding + constant_value if padding is not None else padding for padding in paddings]
 
-        r = a
-        if paddings[0] is not None:
-            r = Cx.sequence.join(paddings[0], r)
-
-        if paddings[1] is not None:
-            r = Cx.sequence.join(r, paddings[1])
+        segments = [segment for segment in (paddings[0], a, paddings[1]) if segment is not None]
+        r = Cx.sequence.join(*segments) if len(segments) > 1 else a
         return r
 
     return inner(x)
@@ -165,11 +162,40 @@ def pad_ctc_labels(ctc_labels, network_output):
     return padded_labels
 
 
+_MEMO_SIZE = 1024
+_memo = OrderedDict()
+
+
+def _memoised(kind: str, x, build):
+    """ Returns the node previously built by `build` for the same variable, building and caching it otherwise.
+
+    The cache is keyed by the uid of the input variable rather than by its sequence axis alone. Sharing a node
+    between two variables with the same sequence axis would pull one variable into the graph of the other, which
+    is invalid when either of them is a placeholder inside a BlockFunction.
+    """
+    x = x.output if isinstance(x, C.Function) else x
+    key = (kind, x.uid)
+
+    if key in _memo:
+        _memo.move_to_end(key)
+        return _memo[key]
+
+    node = build(x)
+    _memo[key] = node
+
+    if len(_memo) > _MEMO_SIZE:
+        _memo.popitem(last=False)
+
+    return node
+
+
 @C.typemap
 def length(x, name=''):
     """
     Calculates the sequence length of the tensor.
 
+    Unnamed length nodes are memoised, calling `length` multiple times on the same variable returns the same node.
+
     Arguments:
         x: input sequence tensor
         name (str, optional): the name of the Function instance in the network
@@ -184,13 +210,20 @@ def length(x, name=''):
     def inner(a):
         return C.expand_dims(C.sequence.reduce_sum(C.sequence.broadcast_as(1, a)), axis=C.Axis.new_leading_axis())
 
-    return inner(x)  # shape: [#] [1, ]
+    if name:
+        return inner(x)
+
+    return _memoised('length', x, inner)  # shape: [#] [1, ]
 
 
-def position(x, name=''):
+def position(x, segment_ids=None, max_seq_len: int = 2 ** 16, name=''):
     """ Returns the position index of every element in the sequence.
 
-    First element of sequence will have position value of 0.
+    First element of sequence will have position value of 0. Unnamed position nodes are memoised,
+    calling `position` multiple times on the same variable returns the same node.
+
+    If `segment_ids` is given (e.g. for sequences packed with `cntkx.misc.pack_sequences`), position restarts
+    from 0 wherever the segment id changes. The start of every segment is propagated with a log-depth `cummax`.
 
     Example:
         a = C.sequence.input_variable(10)
@@ -198,8 +231,14 @@ def position(x, name=''):
 
         assert b.shape == (1,)
 
+        ids = C.sequence.input_variable(1)
+        c = Cx.sequence.position(a, segment_ids=ids)  # ids [0, 0, 0, 1, 1] gives positions [0, 1, 2, 0, 1]
+
     Arguments:
         x: input sequence tensor
+        segment_ids: optional sequence tensor of shape (1, ) with the same sequence axis as `x`, holding
+          segment ids that change between contiguous segments
+        max_seq_len (int): upper bound on the sequence length of `x`, only used with `segment_ids`
         name (str): name of function
 
     Returns:
@@ -212,42 +251,70 @@ def position(x, name=''):
         # reconcile_dynamic_axes is necessary to avoid subtle bugs e.g. sequence.where and one_hot
         return C.expand_dims(C.reconcile_dynamic_axes(C.sequence.where(C.sequence.broadcast_as(1, a)), a), axis=-1)
 
-    return inner(x)  # {#, *] [1,]
+    @C.BlockFunction('Sequence::SegmentPosition', name)
+    def segment_inner(a, ids):
+        p = position(a)
+        is_start = C.not_equal(ids, C.sequence.past_value(ids, initial_state=-1e+30))
+        start = cummax(is_start * p, max_seq_len=max_seq_len)  # position of the start of the current segment
+        return p - start
+
+    if segment_ids is None:
+        return inner(x) if name else _memoised('position', x, inner)  # {#, *] [1,]
 
+    if name:
+        return segment_inner(x, segment_ids)
 
-def stride(x, s, name=''):
-    """ Strides across sequential axis, picking up every s element start from the first sequential element.
+    segment_ids = segment_ids.output if isinstance(segment_ids, C.Function) else segment_ids
+    return _memoised(f'position:{segment_ids.uid}', x, lambda a: segment_inner(a, segment_ids))
+
+
+def stride(x, s: int, offset: int = 0, name=''):
+    """ Strides across sequential axis, picking up every s element starting from sequence element `offset`.
+
+    Elements are selected by their integer position modulo `s` in a single gather. The remainder is computed
+    as `p - s * floor((p + 0.5) / s)`, which stays exact for every integer position representable in float32.
 
     Example:
         seq: [0, 1, 2, 3, 4, 5]
         after stride(seq, 2): [0, 2, 4]
+        after stride(seq, 2, offset=1): [1, 3, 5]
 
     Arguments:
         x: input sequence tensor
         s (int): sequential stride
+        offset (int): position of the first selected sequence element, must be smaller than `s` (default: 0)
         name (str): name of function
 
     Returns:
         :class:`~cntk.ops.functions.Function`
-        Every `s` sequence item of `x` starting from the first sequence item
+        Every `s` sequence item of `x` starting from the `offset` sequence item
 
     """
+    if s < 1:
+        raise ValueError(f"stride must be a positive integer but got {s}")
+
+    if not 0 <= offset < s:
+        raise ValueError(f"offset must be in the range [0, {s}) but got {offset}")
+
     @C.BlockFunction('Sequence::Stride', name)
     def inner(a):
         p = position(a)
-        quotient = p / s  # every s sequence item will be an integer
-        decimals = quotient - C.floor(quotient)  # every s sequence item will be a zero
-        valid = C.equal(decimals, 0)
+        # half is added so that floor is never evaluated right at an integer boundary
+        remainder = p - C.floor((p + 0.5) / s) * s
+        valid = C.equal(remainder, offset)
         result = C.sequence.gather(a, valid)
         return result
 
     return inner(x)
 
 
-def join(x, y, name=''):
-    """ joins two sequences along their dynamic sequence axis. Static axis between a and b
+def join(*sequences, name=''):
+    """ joins two or more sequences along their dynamic sequence axis. Static axis between all sequences
     must be the same and the dimensions of the static axes will remain unchanged in the op.
 
+    Every sequence is unpacked once and the joined sequence is made with a single gather, so the cost
+    is linear in the total length no matter how many sequences are joined.
+
     Example:
         import cntk as C
         import cntkx as Cx
@@ -259,32 +326,70 @@ def join(x, y, name=''):
 
         assert ab.shape == a.shape == b.shape == (3, )
 
+        # [CLS] + sentence A + [SEP] + sentence B
+        cls = C.sequence.input_variable(3)
+        sep = C.sequence.input_variable(3)
+
+        joined = Cx.sequence.join(cls, a, sep, b)
+
     Arguments:
-        x: Sequence tensor
-        y: Sequence tensor
+        sequences: two or more sequence tensors
         name (str): name of function
 
     Returns:
         :class:`~cntk.ops.functions.Function`
-        A new sequence tensor with sequence axis that is the concatenation of the seq axis of a and b
+        A new sequence tensor with sequence axis that is the concatenation of the seq axis of all sequences
+
+    """
+    if len(sequences) < 2:
+        raise ValueError(f"join requires at least two sequences but got {len(sequences)}")
+
+    placeholders = [C.placeholder() for __ in sequences]
+
+    unpacked, masks = zip(*[C.sequence.unpack(p, padding_value=0).outputs for p in placeholders])
+
+    joined_unpacked = C.splice(*unpacked, axis=0)
+    joined_mask = C.expand_dims(C.splice(*masks), axis=-1)
+
+    joined_w_pad = C.to_sequence(joined_unpacked)
+    joined_condition = C.to_sequence(joined_mask)
+
+    joined = C.sequence.gather(joined_w_pad, joined_condition)
+    return C.as_block(joined, list(zip(placeholders, sequences)), 'Sequence::Join', name)
+
 
+def _window(a, width: int, new_axis: bool, causal: bool):
+    """ Concatenates `width` consecutive sequence items by binary doubling.
+
+    A window of width 2k is made of a window of width k and the same window shifted by k, so only
+    O(log(width)) shifted copies are created in the graph instead of `width - 1`.
     """
+    if width < 1:
+        raise ValueError(f"width must be a positive integer but got {width}")
+
+    axis = 0 if new_axis else -1
+    shift = C.sequence.past_value if causal else C.sequence.future_value
 
-    @C.BlockFunction("Sequence::Join", name)
-    def inner(a, b):
-        a_unpacked, a_mask = C.sequence.unpack(a, padding_value=0).outputs
-        b_unpacked, b_mask = C.sequence.unpack(b, padding_value=0).outputs
+    def combine(w, w_width, v, v_width):
+        # v is shifted so that it continues where w ends, history is always spliced in front
+        if causal:
+            return C.splice(shift(v, time_step=w_width), w, axis=axis)
+        return C.splice(w, shift(v, time_step=w_width), axis=axis)
 
-        ab_unpacked = C.splice(a_unpacked, b_unpacked, axis=0)
-        ab_mask = C.expand_dims(C.splice(a_mask, b_mask), axis=-1)
+    power = C.expand_dims(a, axis=0) if new_axis else a
+    power_width = 1
+    result, result_width = None, 0
 
-        ab_w_pad = C.to_sequence(ab_unpacked)
-        ab_condition = C.to_sequence(ab_mask)
+    while True:
+        if width & power_width:
+            result = power if result is None else combine(result, result_width, power, power_width)
+            result_width += power_width
 
-        ab = C.sequence.gather(ab_w_pad, ab_condition)
-        return ab
+        if result_width == width:
+            return result
 
-    return inner(x, y)
+        power = combine(power, power_width, power, power_width)
+        power_width *= 2
 
 
 def window(x, width: int, slide: int, new_axis=False, name=''):
@@ -293,6 +398,8 @@ def window(x, width: int, slide: int, new_axis=False, name=''):
     It effectively reduces the sequence length by `slide` factor while increasing tensor dimension by `width` factor.
     Useful to reduce computation workload in recurrent networks. Used in pyramidal BLSTM in acoustic modelling.
 
+    The window is built by doubling, so the graph contains O(log(width)) shifted copies of the sequence.
+
     Graphic:
         sequence: [0, 1, 2, 3, 4, 5, 6, 7]
         window(sequence, width=2, slide=2)
@@ -323,8 +430,7 @@ def window(x, width: int, slide: int, new_axis=False, name=''):
 
     @C.BlockFunction('Sequence::Window', name)
     def inner(a):
-        future = [C.sequence.future_value(a, time_step=1 + i) for i in range(width - 1)]
-        frames = C.splice(a, *future, axis=C.Axis.new_leading_axis() if new_axis else -1)
+        frames = _window(a, width, new_axis, causal=False)
         y = stride(frames, slide) if slide > 1 else frames
         return y
 
@@ -337,6 +443,8 @@ def window_causal(x, width: int, slide: int, new_axis=False, name=''):
     It effectively reduces the sequence length by `slide` factor while increasing tensor dimension by `width` factor.
     Useful to reduce computation workload in recurrent networks, or to convolution across sequence axis.
 
+    The window is built by doubling, so the graph contains O(log(width)) shifted copies of the sequence.
+
     Note:
         When using `window_causal`, there's a possibility that the last few sequence item might get leftout,
         compared to using `window` above.
@@ -371,14 +479,67 @@ def window_causal(x, width: int, slide: int, new_axis=False, name=''):
     """
     @C.BlockFunction('Sequence::SlidingWindow', name)
     def inner(a):
-        history = list(reversed([C.sequence.past_value(a, time_step=i + 1) for i in range(width - 1)]))
-        frames = C.splice(*history, a, axis=C.Axis.new_leading_axis() if new_axis else -1)
+        frames = _window(a, width, new_axis, causal=True)
         y = stride(frames, slide) if slide > 1 else frames
         return y
 
     return inner(x)
 
 
+def _prepend_state(a, s, num_frames: int):
+    """ prepends the carried frames `s` to every sequence of `a`, see `prepend_state` """
+    u = C.sequence.unpack(a, padding_value=0, no_mask_output=True)
+    # u: [#] [*, static_axes]
+
+    lengths = C.reshape(length(a) + num_frames, ())
+    y = C.to_sequence(C.splice(s, u, axis=0), sequence_lengths=lengths)
+    # y: [#, **] [static_axes], sequence padding of `a` only occurs at the end and so is not part of y
+
+    new_state = C.sequence.unpack(C.sequence.slice(y, -num_frames, 0), padding_value=0, no_mask_output=True)
+    # new_state: [#] [num_frames, static_axes]
+    return y, new_state
+
+
+def prepend_state(x, state, name=''):
+    """ Prepends frames carried over from the previous chunk to every sequence, for chunk by chunk (streaming)
+    evaluation of sequence layers that look at a bounded number of past and future items.
+
+    `state` holds the last `n` items seen so far (zeros at the start of the stream). The result is a sequence on
+    a new sequence axis that starts with these `n` frames and is followed by the items of `x`. It also returns
+    the last `n` frames of that sequence, which are the state to pass in with the next chunk. Memory and
+    compute per chunk are constant, regardless of how much of the stream has already been seen.
+
+    Example:
+        a = C.sequence.input_variable(10)
+        s = C.input_variable((3, 10))
+        b, new_state = Cx.sequence.prepend_state(a, s).outputs
+
+        n = np.random.random((1, 5, 10)).astype(np.float32)
+        results = b.eval({a: n, s: np.zeros((1, 3, 10), dtype=np.float32)})
+
+        assert results[0].shape == (8, 10)
+
+    Arguments:
+        x: input sequence tensor
+        state: carried frames of shape (n, ) + x.shape (not a sequence tensor)
+        name (str): name of function
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`:
+        A new sequence tensor of the carried frames followed by `x`, and the new state
+    """
+    num_frames = state.shape[0]
+
+    if num_frames < 1:
+        raise ValueError(f"state must carry at least one frame but got state of shape {state.shape}")
+
+    @C.BlockFunction('Sequence::PrependState', name)
+    def inner(a, s):
+        return _prepend_state(a, s, num_frames)
+
+    return inner(x, state)
+
+
 def reverse(x, name=''):
     """ Reverses the items in sequence axis
 
@@ -433,20 +594,443 @@ def reverse(x, name=''):
     @C.BlockFunction('Sequence::Reverse', name)
     def inner(a):
         values, valid = C.sequence.unpack(a, padding_value=0).outputs
-        values_reversed = C.slice(values, 0, 0, 0, -1)
-        valid_reversed = C.slice(valid, 0, 0, 0, -1)
+        values_seq = C.to_sequence(C.slice(values, 0, 0, 0, -1))
+        # values_seq: [#, *=max_len] [static_axes...], with the padding of shorter sequences at the front
 
-        values_seq = C.to_sequence(values_reversed)
-        valid_seq = C.to_sequence(C.expand_dims(valid_reversed, axis=-1))
-        a_reversed = C.sequence.gather(values_seq, valid_seq)
+        # item j of values_seq is item (max_len - 1 - j) of a, which is valid when it is smaller than the length of a
+        source_index = C.sequence.broadcast_as(length(values_seq), values_seq) - 1 - position(values_seq)
+        seq_length = C.sequence.broadcast_as(C.reduce_sum(valid, axis=0), values_seq)
+        a_reversed = C.sequence.gather(values_seq, C.less(source_index, seq_length))
         return a_reversed
 
     return inner(x)
 
 
+def _scan(x, op, identity: float, exclusive: bool, max_seq_len: int, block_name: str, name: str):
+    """ helper function for a log-depth (Hillis-Steele) inclusive/exclusive scan along the sequence axis.
+
+    Every step shifts the sequence with `past_value`, which costs O(sequence length) whatever the offset and
+    fills with identity at the start of every sequence, so no static shape is needed and nothing is allocated
+    in proportion to `max_seq_len`.
+    """
+    steps = (max_seq_len - 1).bit_length()  # number of doubling steps to cover max_seq_len
+
+    @C.BlockFunction(block_name, name)
+    def inner(a):
+        z = C.sequence.past_value(a, initial_state=identity) if exclusive else a
+
+        for i in range(steps):
+            z = op(z, C.sequence.past_value(z, initial_state=identity, time_step=2 ** i))
+
+        return z
+
+    return inner(x)
+
+
+def cumsum(x, exclusive: bool = False, max_seq_len: int = 2 ** 16, name=''):
+    """ Calculates the cumulative sum along the dynamic sequence axis.
+
+    The sequence is unpacked once and the prefix sum is computed with a parallel log-depth scan,
+    which is much faster than running `Recurrence(C.plus)` over the sequence.
+
+    `max_seq_len` determines the number of scan steps (log2(max_seq_len)) and must be at least as large as
+    the longest sequence in the minibatch. Every step is a single shift of the sequence, so an overly large
+    `max_seq_len` only costs a few extra steps linear in the actual sequence length.
+
+    Example:
+        a = C.sequence.input_variable(3)
+        b = Cx.sequence.cumsum(a)
+
+        n = [np.random.random((10, 3)).astype(np.float32), ]
+        results = b.eval({a: n})
+        np.testing.assert_almost_equal(results[0], np.cumsum(n[0], axis=0), decimal=5)
+
+    Arguments:
+        x: input sequence tensor
+        exclusive (bool): if True, the i-th output excludes the i-th input (i.e. first output is zero)
+        max_seq_len (int): upper bound on the sequence length of `x`
+        name (str): name of function
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`
+        a sequence tensor with the same shape and sequence axis as `x`
+    """
+    return _scan(x, C.plus, 0, exclusive, max_seq_len, 'Sequence::CumSum', name)
+
+
+def cumprod(x, exclusive: bool = False, max_seq_len: int = 2 ** 16, name=''):
+    """ Calculates the cumulative product along the dynamic sequence axis.
+
+    The sequence is unpacked once and the prefix product is computed with a parallel log-depth scan.
+    `max_seq_len` must be at least as large as the longest sequence in the minibatch.
+
+    Example:
+        a = C.sequence.input_variable(3)
+        b = Cx.sequence.cumprod(a)
+
+        assert b.shape == (3, )
+
+    Arguments:
+        x: input sequence tensor
+        exclusive (bool): if True, the i-th output excludes the i-th input (i.e. first output is one)
+        max_seq_len (int): upper bound on the sequence length of `x`
+        name (str): name of function
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`
+        a sequence tensor with the same shape and sequence axis as `x`
+    """
+    return _scan(x, C.element_times, 1, exclusive, max_seq_len, 'Sequence::CumProd', name)
+
+
+def cummax(x, exclusive: bool = False, max_seq_len: int = 2 ** 16, name=''):
+    """ Calculates the running maximum along the dynamic sequence axis.
+
+    The sequence is unpacked once and the running maximum is computed with a parallel log-depth scan.
+    `max_seq_len` must be at least as large as the longest sequence in the minibatch.
+
+    Example:
+        a = C.sequence.input_variable(3)
+        b = Cx.sequence.cummax(a)
+
+        assert b.shape == (3, )
+
+    Arguments:
+        x: input sequence tensor
+        exclusive (bool): if True, the i-th output excludes the i-th input (i.e. first output is -1e+30)
+        max_seq_len (int): upper bound on the sequence length of `x`
+        name (str): name of function
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`
+        a sequence tensor with the same shape and sequence axis as `x`
+    """
+    return _scan(x, C.element_max, -1e+30, exclusive, max_seq_len, 'Sequence::CumMax', name)
+
+
+def segment_reduce(x, segment_ids, op: str = 'sum', max_seq_len: int = 2 ** 16, name=''):
+    """ Reduces contiguous segments inside every sequence, producing a shorter sequence with one item per segment.
+
+    Useful to pool word-piece frames into word or sentence vectors in a single batched forward pass.
+    Segments are found where `segment_ids` changes between consecutive sequence items, so an id may be reused
+    by a later, non-adjacent segment. Each segment is reduced with a log-depth segmented scan along the sequence.
+    The reduced value is then gathered at the last item of every segment.
+
+    `max_seq_len` determines the number of scan steps (log2(max_seq_len)) and must be at least as large as
+    the longest segment in the minibatch. Every step is a single shift of the sequence, so the cost is linear
+    in the actual sequence length.
+
+    Example:
+        a = C.sequence.input_variable(3)
+        ids = C.sequence.input_variable(1)
+        b = Cx.sequence.segment_reduce(a, ids, op='mean')
+
+        n = [np.random.random((6, 3)).astype(np.float32), ]
+        m = [np.array([0, 0, 0, 1, 2, 2]).reshape((6, 1)).astype(np.float32), ]
+
+        results = b.eval({a: n, ids: m})
+        np.testing.assert_almost_equal(results[0][0], np.mean(n[0][:3], axis=0))
+
+    Arguments:
+        x: input sequence tensor
+        segment_ids: sequence tensor of shape (1, ) with the same sequence axis as `x`, holding non-negative
+          segment ids that are constant within every contiguous segment
+        op (str): reduction within a segment, one of 'sum', 'mean' and 'max'
+        max_seq_len (int): upper bound on the segment length
+        name (str): name of function
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`
+        A new sequence tensor with one sequence item per segment and the same static shape as `x`
+
+    """
+    if op not in ('sum', 'mean', 'max'):
+        raise ValueError(f"op must be one of 'sum', 'mean' and 'max' but got {op}")
+
+    if segment_ids.shape != (1, ):
+        raise ValueError(f"segment_ids must have a shape of (1, ) but got {segment_ids.shape}")
+
+    identity = -1e+30 if op == 'max' else 0
+    steps = (max_seq_len - 1).bit_length()  # number of doubling steps to cover max_seq_len
+
+    @C.BlockFunction('Sequence::SegmentReduce', name)
+    def inner(a, ids):
+        z = a
+        # 1 at the first item of every segment, and after every step at every item whose scan reached that item
+        reached_start = C.not_equal(ids, C.sequence.past_value(ids, initial_state=-1))
+
+        # segmented scan: an item that has reached the start of its segment stops accumulating. Ids may repeat
+        # in later segments, so the carried flag and not the id delimits segments.
+        # reached_start of shape (1, ) broadcasts over the static axes of z.
+        for i in range(steps):
+            shifted = C.sequence.past_value(z, initial_state=identity, time_step=2 ** i)
+            shifted = C.element_select(reached_start, identity, shifted)
+            z = C.element_max(z, shifted) if op == 'max' else z + shifted
+
+            past_reached = C.sequence.past_value(reached_start, initial_state=1, time_step=2 ** i)
+            reached_start = C.greater(reached_start + past_reached, 0)
+
+        is_last = C.not_equal(ids, C.sequence.future_value(ids, initial_state=-1))
+        reduced = C.sequence.gather(z, is_last)
+
+        if op == 'mean':
+            end_position = C.sequence.gather(position(a) + 1, is_last)
+            reduced = reduced / (end_position - C.sequence.past_value(end_position, initial_state=0))
+
+        return reduced
+
+    return inner(x, segment_ids)
+
+
+def _check_window(before: int, after: int):
+    if before < 0 or after < 0:
+        raise ValueError(f"before and after must be non-negative integers but got {before} and {after}")
+
+
+def _beyond_end(a, offset: int):
+    """ 1 where the sequence item `offset` steps into the future is outside the sequence """
+    return C.greater_equal(position(a) + offset, C.sequence.broadcast_as(length(a), a))
+
+
+def _sliding_sum(a, before: int, after: int, max_seq_len: int):
+    """ window sum by differencing the inclusive prefix sum at both ends of the window """
+    prefix = cumsum(a, max_seq_len=max_seq_len)
+
+    upper = prefix
+    if after:
+        last = C.sequence.broadcast_as(C.sequence.last(prefix), a)
+        upper = C.element_select(_beyond_end(a, after), last, C.sequence.future_value(prefix, time_step=after))
+
+    lower = C.sequence.past_value(prefix, time_step=before + 1)
+    return upper - lower
+
+
+def sliding_sum(x, before: int, after: int, max_seq_len: int = 2 ** 16, name=''):
+    """ Sum over a sliding window along the sequence axis. The window of every sequence item `t` spans
+    the items `t - before` to `t + after`. Items outside the sequence count as zero.
+
+    The window sum is the difference of the prefix sum (see `cumsum`) at both ends of the window, so the graph
+    and memory do not grow with the window width. As with any prefix sum differencing, float rounding error
+    grows with the sequence length.
+
+    Example:
+        a = C.sequence.input_variable(3)
+        b = Cx.sequence.sliding_sum(a, before=2, after=1)  # window of width 4
+
+        assert b.shape == a.shape
+
+    Arguments:
+        x: input sequence tensor
+        before (int): number of past items in the window
+        after (int): number of future items in the window
+        max_seq_len (int): upper bound on the sequence length of `x`
+        name (str): name of function
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`
+
+    """
+    _check_window(before, after)
+
+    @C.BlockFunction('Sequence::SlidingSum', name)
+    def inner(a):
+        return _sliding_sum(a, before, after, max_seq_len)
+
+    return inner(x)
+
+
+def sliding_mean(x, before: int, after: int, include_padding: bool = False, max_seq_len: int = 2 ** 16, name=''):
+    """ Mean over a sliding window along the sequence axis. The window of every sequence item `t` spans
+    the items `t - before` to `t + after`.
+
+    Computed from `sliding_sum`, so the graph and memory do not grow with the window width.
+
+    Example:
+        a = C.sequence.input_variable(3)
+        b = Cx.sequence.sliding_mean(a, before=2, after=2)
+
+        assert b.shape == a.shape
+
+    Arguments:
+        x: input sequence tensor
+        before (int): number of past items in the window
+        after (int): number of future items in the window
+        include_padding (bool): if True, items outside the sequence count as zero and every window is divided by
+          its full width. Otherwise only items inside the sequence are averaged.
+        max_seq_len (int): upper bound on the sequence length of `x`
+        name (str): name of function
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`
+
+    """
+    _check_window(before, after)
+
+    @C.BlockFunction('Sequence::SlidingMean', name)
+    def inner(a):
+        total = _sliding_sum(a, before, after, max_seq_len)
+
+        if include_padding:
+            return total / (before + after + 1)
+
+        p = position(a)
+        last_position = C.sequence.broadcast_as(length(a), a) - 1
+        count = C.element_min(p + after, last_position) - C.element_max(p - before, 0) + 1
+        return total / count
+
+    return inner(x)
+
+
+def sliding_max(x, before: int, after: int, padding_value: float = None, name=''):
+    """ Max over a sliding window along the sequence axis. The window of every sequence item `t` spans
+    the items `t - before` to `t + after`.
+
+    Uses block decomposition (van Herk/Gil-Werman). The sequence is cut into blocks as wide as the window, and
+    every window is the max of a suffix max of one block and a prefix max of the next. The in-block prefix and
+    suffix maxes are log-depth scans, so the graph has O(log(width)) nodes and memory does not grow with the width.
+
+    Example:
+        a = C.sequence.input_variable(3)
+        b = Cx.sequence.sliding_max(a, before=0, after=15)
+
+        assert b.shape == a.shape
+
+    Arguments:
+        x: input sequence tensor
+        before (int): number of past items in the window
+        after (int): number of future items in the window
+        padding_value (float): if not None, windows that extend beyond the sequence also include this value.
+          Otherwise items outside the sequence are ignored.
+        name (str): name of function
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`
+
+    """
+    _check_window(before, after)
+    width = before + after + 1
+    steps = (width - 1).bit_length()  # number of doubling steps to cover a block
+
+    @C.BlockFunction('Sequence::SlidingMax', name)
+    def inner(a):
+        minus_inf = C.constant(-1e+30)
+
+        def block_index(p):
+            # half is added so that floor is never evaluated right at an integer boundary
+            return C.floor((p + 0.5) / width)
+
+        p = position(a)
+        offset = p - block_index(p) * width  # position within block
+
+        prefix, suffix = a, a
+        for i in range(steps):
+            k = 2 ** i
+            past = C.sequence.past_value(prefix, initial_state=minus_inf, time_step=k)
+            future = C.sequence.future_value(suffix, initial_state=minus_inf, time_step=k)
+            prefix = C.element_max(prefix, C.element_select(C.greater_equal(offset, k), past, minus_inf))
+            suffix = C.element_max(suffix, C.element_select(C.less(offset + k, width), future, minus_inf))
+
+        # window [t - before, t + after]: suffix max at its start and prefix max at its end
+        start = C.sequence.past_value(suffix, initial_state=minus_inf, time_step=before) if before else suffix
+
+        end = prefix
+        if after:
+            beyond_end = _beyond_end(a, after)
+            last_position = C.sequence.broadcast_as(length(a), a) - 1
+            # beyond the sequence, the prefix max of the last block only counts if the window ends in that block
+            in_last_block = C.equal(block_index(p + after), block_index(last_position))
+            last = C.element_select(in_last_block, C.sequence.broadcast_as(C.sequence.last(prefix), a), minus_inf)
+            end = C.element_select(beyond_end, last, C.sequence.future_value(prefix, time_step=after))
+
+        result = C.element_max(start, end)
+
+        if padding_value is not None:
+            crosses = C.less(p, before) if before else C.constant(0)
+            crosses = C.greater(crosses + _beyond_end(a, after), 0) if after else crosses
+            result = C.element_select(crosses, C.element_max(result, padding_value), result)
+
+        return result
+
+    return inner(x)
+
+
+_POOLS = ('first', 'last', 'max', 'mean', 'sum')
+
+
+def reduce_pool(x, pools=('last', 'max', 'mean'), axis=0, name=''):
+    """ Fused sequence pooling: computes any subset of first, last, max, mean and sum over the sequence axis
+    and concatenates them along `axis` in the order given.
+
+    The sequence is unpacked once and every statistic is reduced from the same unpacked tensor and mask,
+    instead of traversing the sequence once per statistic.
+
+    Examples:
+        n = 32
+        a = C.sequence.input_variable(n)
+        b = Cx.sequence.reduce_pool(a, pools=('first', 'max', 'sum'))
+
+        assert b.shape == (n * 3, )
+
+    Arguments:
+        x: input sequence tensor
+        pools (str or tuple of str): statistics to compute, any of 'first', 'last', 'max', 'mean' and 'sum'
+        axis: concatenation axis
+        name (`str`, optional): the name of the Function instance in the network
+
+    Returns:
+        :class:`~cntk.ops.functions.Function`
+        Not a sequence tensor (i.e. no dynamic sequence axis)
+
+    """
+    pools = (pools, ) if isinstance(pools, str) else tuple(pools)
+
+    if not pools or any(pool not in _POOLS for pool in pools):
+        raise ValueError(f"pools must be a non-empty subset of {_POOLS} but got {pools}")
+
+    @C.BlockFunction('Sequence::ReducePool', name)
+    def inner(a):
+        values, mask = C.sequence.unpack(a, padding_value=0).outputs
+        # values: [#] [*, static_axes...], mask: [#] [*]
+
+        broadcast_mask = mask
+        for __ in x.shape:
+            broadcast_mask = C.expand_dims(broadcast_mask, axis=-1)
+        # broadcast_mask: [#] [*, 1, ...]
+
+        def reduced(z):
+            # BUGBUG: do not set keepdims=False in reduce ops, will raise error
+            return C.squeeze(C.reduce_sum(z, axis=0), axes=0)
+
+        results = {}
+        if 'sum' in pools or 'mean' in pools:
+            results['sum'] = reduced(values)
+
+        if 'mean' in pools:
+            results['mean'] = results['sum'] / C.reduce_sum(mask, axis=0)
+
+        if 'max' in pools:
+            minus_inf = C.constant(-1e+30)
+            results['max'] = C.squeeze(C.reduce_max(C.element_select(broadcast_mask, values, minus_inf), axis=0), axes=0)
+
+        if 'first' in pools:
+            results['first'] = C.squeeze(C.slice(values, 0, 0, 1), axes=0)
+
+        if 'last' in pools:
+            # last valid item is where the mask is one and the next item in the mask is zero
+            next_mask = C.slice(C.splice(broadcast_mask, C.zeros_like(C.slice(broadcast_mask, 0, 0, 1)), axis=0), 0, 1, 0)
+            results['last'] = reduced(values * (broadcast_mask - next_mask))
+
+        pooled = [results[pool] for pool in pools]
+        return C.splice(*pooled, axis=axis) if len(pooled) > 1 else pooled[0]
+
+    return inner(x)
+
+
 def reduce_mean(seq, name=''):
     """ Computes the mean of the input sequence's elements across the sequence axis.
 
+    The sum and the sequence length are reduced from a single unpack (see `reduce_pool`).
+
     Examples:
         import cntk as C
         import cntkx as Cx
@@ -469,14 +1053,9 @@ def reduce_mean(seq, name=''):
         :class:`~cntk.ops.functions.Function`
 
     """
-
-    @C.BlockFunction('Sequence::ReduceMean', name)
-    def inner(a):
-        b = C.sequence.reduce_sum(a)
-        c = b / Cx.sequence.length(a)
-        return c
-
-    return inner(seq)
+    # reduce_pool broadcasts its mask over the static axes of its input, so it is applied to seq directly
+    # rather than to a placeholder of unknown shape inside another block
+    return reduce_pool(seq, pools='mean', name=name)
 
 
 def reduce_concat_pool(x, axis=0, name=''):
@@ -484,6 +1063,8 @@ def reduce_concat_pool(x, axis=0, name=''):
     This is can be used as a drop-in replacement anytime sequence.last is used. It will provide superior performance
     compared to it.
 
+    All three statistics are computed from a single unpack of the sequence (see `reduce_pool`).
+
     Examples:
         n = 32
         a = C.sequence.input_variable(n)
@@ -500,8 +1081,4 @@ def reduce_concat_pool(x, axis=0, name=''):
         :class:`~cntk.ops.functions.Function`
 
     """
-    @C.BlockFunction('Sequence::ReduceConcatPool', name)
-    def inner(a):
-        return C.splice(C.sequence.last(a), C.sequence.reduce_max(a), Cx.sequence.reduce_mean(a), axis=axis)
-
-    return inner(x)
+    return reduce_pool(x, pools=('last', 'max', 'mean'), axis=axis, name=name)
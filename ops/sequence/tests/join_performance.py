@@ -0,0 +1,34 @@
+import cntk as C
+from cntkx.ops.sequence import join
+from cntkx.misc.benchmark import benchmark
+import numpy as np
+
+
+def nested_join(sequences):
+    """ reference implementation with k - 1 pairwise joins """
+    joined = sequences[0]
+    for sequence in sequences[1:]:
+        joined = join(joined, sequence)
+    return joined
+
+
+minibatch_size = 16
+dim = 256
+segment_length = 64
+
+for k in [2, 4, 8, 16, 32]:
+    sequences = [C.sequence.input_variable(dim) for __ in range(k)]
+    feed = {s: np.random.random((minibatch_size, segment_length, dim)).astype(np.float32) for s in sequences}
+
+    nested = nested_join(sequences)
+    single = join(*sequences)
+
+    np.testing.assert_equal(nested.eval(feed), single.eval(feed))
+
+    duration_nested = benchmark(nested, feed)
+    duration_single = benchmark(single, feed)
+    total_length = k * segment_length
+
+    print(f"segments: {k}, total length: {total_length}, "
+          f"nested: {duration_nested:.5f}s ({duration_nested / total_length * 1e6:.2f}us/step), "
+          f"single gather: {duration_single:.5f}s ({duration_single / total_length * 1e6:.2f}us/step)")
@@ -0,0 +1,39 @@
+import cntk as C
+from cntkx.ops.sequence import reverse
+from cntkx.misc.benchmark import benchmark
+import numpy as np
+
+
+def masked_reverse(x):
+    """ reference implementation that reverses and re-sequences both the values and the mask """
+    values, valid = C.sequence.unpack(x, padding_value=0).outputs
+    values_seq = C.to_sequence(C.slice(values, 0, 0, 0, -1))
+    valid_seq = C.to_sequence(C.expand_dims(C.slice(valid, 0, 0, 0, -1), axis=-1))
+    return C.sequence.gather(values_seq, valid_seq)
+
+
+minibatch_size = 32
+max_length = 2000
+dim = 128
+
+distributions = {
+    'equal': lambda: np.full(minibatch_size, max_length),
+    'uniform': lambda: np.random.randint(1, max_length + 1, minibatch_size),
+    'skewed': lambda: np.concatenate([[max_length], np.random.randint(1, max_length // 20, minibatch_size - 1)]),
+}
+
+a = C.sequence.input_variable(dim)
+reference = masked_reverse(a)
+lean = reverse(a)
+
+for distribution, lengths in distributions.items():
+    n = [np.random.random((l, dim)).astype(np.float32) for l in lengths()]
+
+    for desired, result in zip(reference.eval({a: n}), lean.eval({a: n})):
+        np.testing.assert_equal(desired, result)
+
+    duration_reference = benchmark(reference, {a: n})
+    duration_lean = benchmark(lean, {a: n})
+
+    print(f"lengths: {distribution}, masked reverse: {duration_reference:.5f}s, reverse: {duration_lean:.5f}s, "
+          f"speedup: {duration_reference / duration_lean:.2f}x")
@@ -1,6 +1,7 @@
 import cntk as C
 from cntkx.ops.sequence import length, pad, stride, position, join, window, reverse, reduce_mean, reduce_concat_pool
-from cntkx.ops.sequence import window_causal, pad_to, pad_ctc_labels
+from cntkx.ops.sequence import window_causal, pad_to, pad_ctc_labels, cumsum, cumprod, cummax, reduce_pool
+from cntkx.ops.sequence import segment_reduce, sliding_sum, sliding_mean, sliding_max, prepend_state
 import numpy as np
 import pytest
 
@@ -151,6 +152,39 @@ def test_pad_ctc_labels():
         assert result.shape[0] == seq.shape[0]
 
 
+def test_position_length_memoised():
+    a = C.sequence.input_variable(3)
+    b = C.sequence.input_variable(3)
+
+    assert position(a).output.uid == position(a).output.uid
+    assert length(a).output.uid == length(a).output.uid
+    assert position(a).output.uid != position(b).output.uid
+    assert position(a).output.uid != position(a, name='named').output.uid
+
+    c = position(a) + position(a) + length(a)
+    n = [np.random.random((4, 3)).astype(np.float32), np.random.random((2, 3)).astype(np.float32)]
+
+    results = c.eval({a: n})
+    np.testing.assert_equal(results[0], np.arange(4)[:, None] * 2 + 4)
+    np.testing.assert_equal(results[1], np.arange(2)[:, None] * 2 + 2)
+
+
+def test_position_segment_ids():
+    a = C.sequence.input_variable(3)
+    ids = C.sequence.input_variable(1)
+    b = position(a, segment_ids=ids)
+
+    segments = [[0, 0, 0, 1, 1, 2], [4], [0, 1, 1, 1, 0, 0, 0]]
+    n = [np.random.random((len(s), 3)).astype(np.float32) for s in segments]
+    m = [np.array(s, dtype=np.float32).reshape((-1, 1)) for s in segments]
+    desired = [[0, 1, 2, 0, 1, 0], [0], [0, 0, 1, 2, 0, 1, 2]]
+
+    results = b.eval({a: n, ids: m})
+
+    for result, d in zip(results, desired):
+        np.testing.assert_equal(result, np.array(d, dtype=np.float32).reshape((-1, 1)))
+
+
 def test_stride():
     contexts = [(10, 2), (10, 3), (10, 4), (10, 5), (10, 6),
                 (5000, 2), (5000, 3), (5000, 4), (5000, 5), (5000, 6),
@@ -194,6 +228,21 @@ def test_stride():
         np.testing.assert_equal(actual, desired[::s])
 
 
+def test_stride_offset():
+    a = C.sequence.input_variable(10)
+
+    for seq_length, s, offset in [(10, 3, 1), (10, 3, 2), (5000, 7, 6), (1000000, 3, 1)]:
+        b = stride(a, s, offset=offset)
+
+        n = np.random.random((1, seq_length, 10)).astype(np.float32)
+
+        output = b.eval({a: n})[0]
+        np.testing.assert_equal(output, n[0][offset::s, ...])
+
+    with pytest.raises(ValueError):
+        stride(a, 2, offset=2)
+
+
 def test_join():
     a = C.sequence.input_variable(3)
     b = C.sequence.input_variable(3)
@@ -215,6 +264,24 @@ def test_join():
         np.testing.assert_equal(result, desired)
 
 
+def test_join_many():
+    sequences = [C.sequence.input_variable((2, 3)) for __ in range(5)]
+    joined = join(*sequences)
+
+    assert joined.shape == (2, 3)
+
+    lengths = [[1, 4, 7], [3, 1, 2], [1, 1, 1], [5, 2, 9], [2, 6, 1]]  # [sequence][batch]
+    n = [[np.random.random((l, 2, 3)).astype(np.float32) for l in ls] for ls in lengths]
+
+    results = joined.eval({s: nn for s, nn in zip(sequences, n)})
+
+    for i, result in enumerate(results):
+        np.testing.assert_equal(result, np.concatenate([nn[i] for nn in n], axis=0))
+
+    with pytest.raises(ValueError):
+        join(sequences[0])
+
+
 def test_window():
     # ====================================================================
     # window width = 2
@@ -297,6 +364,51 @@ def test_window_causal():
     np.testing.assert_equal(result, desired)
 
 
+@pytest.mark.parametrize("width, slide", [(5, 1), (5, 2), (8, 3), (13, 13)])
+def test_window_widths(width, slide):
+    """ doubling construction gives the same windows as splicing every shifted copy """
+    seq_length = 30
+    a = C.sequence.input_variable((2, 3))
+
+    n = np.random.random((1, seq_length, 2, 3)).astype(np.float32)
+    padded = np.pad(n[0], ((width - 1, width - 1), (0, 0), (0, 0)), mode='constant', constant_values=0)
+    future = [padded[width - 1 + i: width - 1 + i + seq_length] for i in range(width)]
+    history = [padded[i: i + seq_length] for i in range(width)]
+
+    b = window(a, width=width, slide=slide)
+    assert b.shape == (2, 3 * width)
+    np.testing.assert_equal(b.eval({a: n})[0], np.concatenate(future, axis=-1)[::slide])
+
+    b = window(a, width=width, slide=slide, new_axis=True)
+    assert b.shape == (width, 2, 3)
+    np.testing.assert_equal(b.eval({a: n})[0], np.stack(future, axis=1)[::slide])
+
+    b = window_causal(a, width=width, slide=slide)
+    assert b.shape == (2, 3 * width)
+    np.testing.assert_equal(b.eval({a: n})[0], np.concatenate(history, axis=-1)[::slide])
+
+    b = window_causal(a, width=width, slide=slide, new_axis=True)
+    assert b.shape == (width, 2, 3)
+    np.testing.assert_equal(b.eval({a: n})[0], np.stack(history, axis=1)[::slide])
+
+
+def test_prepend_state():
+    a = C.sequence.input_variable(2)
+    s = C.input_variable((3, 2))
+    b, new_state = prepend_state(a, s).outputs
+
+    n = [np.random.random((l, 2)).astype(np.float32) for l in (5, 1, 2)]
+    state = np.random.random((3, 3, 2)).astype(np.float32)
+
+    results = b.eval({a: n, s: state})
+    new_states = new_state.eval({a: n, s: state})
+
+    for r, ns, x, st in zip(results, new_states, n, state):
+        desired = np.concatenate([st, x], axis=0)
+        np.testing.assert_equal(r, desired)
+        np.testing.assert_equal(ns, desired[-3:])
+
+
 def test_reverse():
     ndim = 3
     a = C.sequence.input_variable(ndim)
@@ -312,6 +424,57 @@ def test_reverse():
         desired = input_array[::-1, ...]
         np.testing.assert_equal(result, desired)
 
+    # skewed lengths and reversing twice
+    a = C.sequence.input_variable((2, 3))
+    r = reverse(reverse(a))
+
+    n = [np.random.random((l, 2, 3)).astype(np.float32) for l in (1, 50, 2, 3)]
+
+    for result, input_array in zip(r.eval({a: n}), n):
+        np.testing.assert_equal(result, input_array)
+
+
+def test_sequence_cumsum():
+    a = C.sequence.input_variable((3, 2))
+    b = cumsum(a)
+    c = cumsum(a, exclusive=True)
+
+    assert b.shape == c.shape == (3, 2)
+
+    n = [np.random.random((10, 3, 2)).astype(np.float32),
+         np.random.random((1, 3, 2)).astype(np.float32),
+         np.random.random((37, 3, 2)).astype(np.float32), ]
+
+    results = b.eval({a: n})
+    results_exclusive = c.eval({a: n})
+
+    for r, re, nn in zip(results, results_exclusive, n):
+        np.testing.assert_almost_equal(r, np.cumsum(nn, axis=0), decimal=5)
+        np.testing.assert_almost_equal(re, np.cumsum(nn, axis=0) - nn, decimal=5)
+
+    # max_seq_len smaller than the default reduces the number of scan steps
+    b = cumsum(a, max_seq_len=37)
+    results = b.eval({a: n})
+
+    for r, nn in zip(results, n):
+        np.testing.assert_almost_equal(r, np.cumsum(nn, axis=0), decimal=5)
+
+
+def test_sequence_cumprod_cummax():
+    a = C.sequence.input_variable(4)
+    b = cumprod(a)
+    c = cummax(a)
+
+    n = [np.random.uniform(0.5, 1.5, (10, 4)).astype(np.float32),
+         np.random.uniform(0.5, 1.5, (3, 4)).astype(np.float32),
+         np.random.uniform(0.5, 1.5, (17, 4)).astype(np.float32), ]
+
+    for r, nn in zip(b.eval({a: n}), n):
+        np.testing.assert_allclose(r, np.cumprod(nn, axis=0), rtol=1e-5)
+
+    for r, nn in zip(c.eval({a: n}), n):
+        np.testing.assert_equal(r, np.maximum.accumulate(nn, axis=0))
+
 
 def test_reduce_mean():
     a = C.sequence.input_variable(32)
@@ -350,3 +513,85 @@ def test_reduce_concat_pool():
          np.random.random((10, 32)).astype(np.float32), ]
 
     b.eval({a: n})
+
+
+def test_reduce_pool():
+    a = C.sequence.input_variable((3, 4))
+    b = reduce_pool(a, pools=('first', 'last', 'max', 'mean', 'sum'))
+
+    assert b.shape == (15, 4)
+
+    n = [np.random.random((10, 3, 4)).astype(np.float32) - 2,
+         np.random.random((1, 3, 4)).astype(np.float32) - 2,
+         np.random.random((5, 3, 4)).astype(np.float32) - 2, ]
+
+    results = b.eval({a: n})
+
+    for r, d in zip(results, n):
+        desired = np.concatenate([d[0], d[-1], np.max(d, axis=0), np.mean(d, axis=0), np.sum(d, axis=0)], axis=0)
+        np.testing.assert_almost_equal(r, desired, decimal=5)
+
+    b = reduce_pool(a, pools='max')
+    assert b.shape == (3, 4)
+
+    with pytest.raises(ValueError):
+        reduce_pool(a, pools=('median', ))
+
+
+@pytest.mark.parametrize("op, reduce", [('sum', np.sum), ('mean', np.mean), ('max', np.max)])
+def test_segment_reduce(op, reduce):
+    a = C.sequence.input_variable((2, 3))
+    ids = C.sequence.input_variable(1)
+    b = segment_reduce(a, ids, op=op)
+
+    assert b.shape == (2, 3)
+
+    segments = [[0, 0, 0, 1, 2, 2, 2, 2, 3],
+                [5],
+                [0, 1, 1, 1, 1, 1, 1, 0, 0]]  # ids only need to change between contiguous segments
+
+    n = [np.random.random((len(s), 2, 3)).astype(np.float32) - 0.5 for s in segments]
+    m = [np.array(s).reshape((-1, 1)).astype(np.float32) for s in segments]
+
+    results = b.eval({a: n, ids: m})
+
+    for result, nn, s in zip(results, n, segments):
+        boundaries = [0] + [i for i in range(1, len(s)) if s[i] != s[i - 1]] + [len(s)]
+        desired = np.stack([reduce(nn[start:end], axis=0) for start, end in zip(boundaries[:-1], boundaries[1:])])
+        np.testing.assert_almost_equal(result, desired, decimal=5)
+
+
+@pytest.mark.parametrize("before, after", [(0, 0), (0, 7), (3, 0), (2, 5), (9, 9), (20, 3)])
+def test_sliding_reductions(before, after):
+    a = C.sequence.input_variable((2, 3))
+
+    n = [np.random.random((l, 2, 3)).astype(np.float32) - 0.5 for l in (1, 6, 17, 40)]
+
+    def windows(d):
+        return [d[max(t - before, 0): t + after + 1] for t in range(d.shape[0])]
+
+    def crosses(d, t):
+        return t - before < 0 or t + after >= d.shape[0]
+
+    results = sliding_sum(a, before, after).eval({a: n})
+    for r, d in zip(results, n):
+        np.testing.assert_almost_equal(r, np.stack([np.sum(w, axis=0) for w in windows(d)]), decimal=5)
+
+    results = sliding_mean(a, before, after).eval({a: n})
+    for r, d in zip(results, n):
+        np.testing.assert_almost_equal(r, np.stack([np.mean(w, axis=0) for w in windows(d)]), decimal=5)
+
+    results = sliding_mean(a, before, after, include_padding=True).eval({a: n})
+    for r, d in zip(results, n):
+        desired = np.stack([np.sum(w, axis=0) / (before + after + 1) for w in windows(d)])
+        np.testing.assert_almost_equal(r, desired, decimal=5)
+
+    results = sliding_max(a, before, after).eval({a: n})
+    for r, d in zip(results, n):
+        np.testing.assert_almost_equal(r, np.stack([np.max(w, axis=0) for w in windows(d)]))
+
+    results = sliding_max(a, before, after, padding_value=0).eval({a: n})
+    for r, d in zip(results, n):
+        desired = np.stack([np.maximum(np.max(w, axis=0), 0) if crosses(d, t) else np.max(w, axis=0)
+                            for t, w in enumerate(windows(d))])
+        np.testing.assert_almost_equal(r, desired)
@@ -0,0 +1,30 @@
+import cntk as C
+from cntkx.ops.sequence import window, window_causal
+from cntkx.misc.benchmark import count_nodes, benchmark
+import numpy as np
+
+
+def spliced_window(a, width):
+    """ reference implementation with one shifted copy per window item """
+    future = [C.sequence.future_value(a, time_step=1 + i) for i in range(width - 1)]
+    return C.splice(a, *future, axis=-1)
+
+
+minibatch_size = 8
+dim = 64
+
+for seq_length in [1000, 10000]:
+    a = C.sequence.input_variable(dim)
+    n = np.random.random((minibatch_size, seq_length, dim)).astype(np.float32)
+
+    for width in [2, 4, 8, 16, 32, 64]:
+        spliced = spliced_window(a, width)
+        doubled = window(a, width, slide=1)
+        causal = window_causal(a, width, slide=1)
+
+        np.testing.assert_equal(spliced.eval({a: n[:1, :100]}), doubled.eval({a: n[:1, :100]}))
+
+        print(f"seq_length: {seq_length}, width: {width}, "
+              f"spliced: {count_nodes(spliced)} nodes {benchmark(spliced, {a: n}):.5f}s, "
+              f"window: {count_nodes(doubled)} nodes {benchmark(doubled, {a: n}):.5f}s, "
+              f"window_causal: {count_nodes(causal)} nodes {benchmark(causal, {a: n}):.5f}s")
@@ -0,0 +1,35 @@
+import cntk as C
+from cntkx.ops import erf, gelu, mish, swish
+import numpy as np
+import multiprocessing as mp
+import resource
+import time
+
+
+def forward_backward(activation, fused, queue, minibatch_size=32, seq_length=128, hidden_dim=768, n_iter=20):
+    """ runs in a separate process so that peak resident memory is measured per configuration """
+    a = C.sequence.input_variable(hidden_dim, needs_gradient=True)
+    b = activation(a, fused=fused)
+    n = np.random.normal(size=(minibatch_size, seq_length, hidden_dim)).astype(np.float32)
+
+    b.grad({a: n}, wrt=[a])  # warm up
+
+    start = time.time()
+    for __ in range(n_iter):
+        b.grad({a: n}, wrt=[a])
+    duration = (time.time() - start) / n_iter
+
+    queue.put((duration, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+if __name__ == '__main__':
+    for activation in [erf, gelu, mish, swish]:
+        for fused in [False, True]:
+            queue = mp.Queue()
+            process = mp.Process(target=forward_backward, args=(activation, fused, queue))
+            process.start()
+            duration, max_rss = queue.get()
+            process.join()
+
+            print(f"{activation.__name__}, fused: {fused}, forward + backward: {duration:.4f}s, "
+                  f"peak memory: {max_rss / 1024:.0f}MB")
@@ -0,0 +1,43 @@
+import cntk as C
+from cntkx.ops import batchmatmul
+from cntkx.misc.benchmark import benchmark
+import numpy as np
+
+
+minibatch_size = 16
+seq_length = 100
+model_dim = 64
+output_dim = 128
+
+for heads in [1, 4, 8, 16]:
+    a = C.sequence.input_variable((heads, 10, model_dim))
+    w = C.parameter((model_dim, output_dim), init=C.glorot_uniform())
+
+    n = np.random.random((minibatch_size, seq_length, heads, 10, model_dim)).astype(np.float32)
+
+    # folded implementation: right operand has to be tiled to every head, both operands are re-sequenced
+    tiled = C.splice(*[C.expand_dims(w, axis=0)] * heads, axis=0)
+    folded = batchmatmul(a, C.sequence.broadcast_as(tiled, a))
+
+    # broadcast implementation: single times without unpacking or re-sequencing
+    broadcast = batchmatmul(a, w)
+
+    np.testing.assert_almost_equal(folded.eval({a: n}), broadcast.eval({a: n}), decimal=4)
+
+    duration_folded = benchmark(folded, {a: n}, n_iter=50)
+    duration_broadcast = benchmark(broadcast, {a: n}, n_iter=50)
+
+    print(f"heads: {heads}, folded: {duration_folded:.5f}s, broadcast: {duration_broadcast:.5f}s, "
+          f"speedup: {duration_folded / duration_broadcast:.2f}x")
+
+for batch in [(4, ), (2, 4), (2, 2, 4)]:
+    a = C.sequence.input_variable(batch + (10, model_dim))
+    b = C.sequence.input_variable(batch + (model_dim, 10))
+
+    n = np.random.random((minibatch_size, seq_length) + batch + (10, model_dim)).astype(np.float32)
+    m = np.random.random((minibatch_size, seq_length) + batch + (model_dim, 10)).astype(np.float32)
+
+    c = batchmatmul(a, b, batch_rank=len(batch))
+    duration = benchmark(c, {a: n, b: m}, n_iter=50)
+
+    print(f"batch axes: {batch}, duration: {duration:.5f}s")
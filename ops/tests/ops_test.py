@@ -1,5 +1,6 @@
 import cntk as C
 from cntkx.ops import cumsum, hardmax, erf, batchmatmul, scalar, gelu, gelu_fast, floor_division, remainder
+from cntkx.ops import upsample, swish, mish
 import numpy as np
 from numpy.testing import assert_equal
 import pytest
@@ -46,6 +47,72 @@ def test_cumsum():
     assert_equal(results[0], n.cumsum())
 
 
+def test_cumsum_exclusive_reverse():
+    a = C.input_variable(5)
+    n = np.array([1, 2, 3, 4, 5]).astype(np.float32)[None, ...]
+
+    results = cumsum(a, exclusive=True).eval({a: n})
+    assert_equal(results[0], [0, 1, 3, 6, 10])
+
+    results = cumsum(a, reverse=True).eval({a: n})
+    assert_equal(results[0], [15, 14, 12, 9, 5])
+
+    results = cumsum(a, exclusive=True, reverse=True).eval({a: n})
+    assert_equal(results[0], [14, 12, 9, 5, 0])
+
+
+def test_cumsum_scan():
+    """ axis wider than scan_threshold uses the log-depth scan """
+    d = 1000
+    a = C.input_variable((3, d))
+    n = np.random.random((2, 3, d)).astype(np.float32)
+
+    b = cumsum(a, scan_threshold=256)
+    assert b.shape == (3, d)
+    np.testing.assert_allclose(b.eval({a: n}), np.cumsum(n, axis=-1), rtol=1e-4, atol=1e-3)
+
+    b = cumsum(a, exclusive=True, reverse=True, scan_threshold=256)
+    desired = np.cumsum(n[..., ::-1], axis=-1)[..., ::-1] - n
+    np.testing.assert_allclose(b.eval({a: n}), desired, rtol=1e-4, atol=1e-3)
+
+    # scan along a non-last axis must match the matmul implementation
+    a = C.input_variable((7, 4))
+    n = np.random.random((2, 7, 4)).astype(np.float32)
+    scan = cumsum(a, axis=0, scan_threshold=2).eval({a: n})
+    matmul = cumsum(a, axis=0).eval({a: n})
+    np.testing.assert_almost_equal(scan, matmul, decimal=5)
+    np.testing.assert_almost_equal(scan, np.cumsum(n, axis=1), decimal=5)
+
+
+def test_upsample():
+    a = C.input_variable((3, 5, 7))
+    n = np.random.random((2, 3, 5, 7)).astype(np.float32)
+
+    b = upsample(a)
+    assert b.shape == (3, 10, 14)
+    np.testing.assert_equal(b.eval({a: n}), n.repeat(2, axis=2).repeat(2, axis=3))
+
+    b = upsample(a, factor=(3, 2))
+    assert b.shape == (3, 15, 14)
+    np.testing.assert_equal(b.eval({a: n}), n.repeat(3, axis=2).repeat(2, axis=3))
+
+    b = upsample(a, factor=(2, 4), mode='bilinear')
+    assert b.shape == (3, 10, 28)
+
+    # bilinear interpolation of a constant image is constant
+    m = np.ones((2, 3, 5, 7), dtype=np.float32)
+    np.testing.assert_almost_equal(b.eval({a: m}), np.ones((2, 3, 10, 28)), decimal=6)
+
+    # bilinear interpolation of a ramp along columns, away from the borders
+    m = np.tile(np.arange(7, dtype=np.float32), (2, 3, 5, 1))
+    result = b.eval({a: m})
+    desired = (np.arange(28) + 0.5) / 4 - 0.5
+    np.testing.assert_almost_equal(result[0, 0, 0, 2:-2], desired[2:-2], decimal=5)
+
+    with pytest.raises(ValueError):
+        upsample(a, mode='bicubic')
+
+
 def test_hardmax():
     a = C.input_variable((3, 5))
 
@@ -93,6 +160,9 @@ def test_erf():
 
     np.testing.assert_almost_equal(np.array(results), ans, decimal=6)
 
+    # erf is an odd function
+    np.testing.assert_almost_equal(b.eval({a: -n}), -np.array(ans), decimal=6)
+
 
 def test_gelu():
     a = C.input_variable(10)
@@ -114,6 +184,27 @@ def test_gelu_fast():
     b.eval({a: n})
 
 
+@pytest.mark.parametrize("activation", [erf, gelu, mish, swish])
+def test_fused_activation(activation):
+    """ fused user function has the same forward and backward result as the BlockFunction """
+    a = C.input_variable(10, needs_gradient=True)
+    n = np.random.normal(scale=3, size=(8, 10)).astype(np.float32)
+
+    block = activation(a)
+    fused = activation(a, fused=True)
+    assert fused.shape == block.shape == (10, )
+
+    np.testing.assert_almost_equal(fused.eval({a: n}), block.eval({a: n}), decimal=5)
+    np.testing.assert_almost_equal(fused.grad({a: n}, wrt=[a]), block.grad({a: n}, wrt=[a]), decimal=4)
+
+    # variable length sequences
+    a = C.sequence.input_variable(10)
+    n = [np.random.normal(size=(3, 10)).astype(np.float32), np.random.normal(size=(6, 10)).astype(np.float32)]
+
+    for f, b in zip(activation(a, fused=True).eval({a: n}), activation(a).eval({a: n})):
+        np.testing.assert_almost_equal(f, b, decimal=5)
+
+
 def test_seq_batchmatmul0():
     """ sequence axis present, left operand is matrix and right operand is vector """
     dynamic_batch = 2
@@ -344,3 +435,64 @@ def test_seq_batchmatmul7():
 
     for result, desired in zip(results, desired_results):
         np.testing.assert_almost_equal(result, desired, decimal=7)
+
+
+def test_batchmatmul_broadcast_right():
+    """ right operand without batch axis is broadcast over all batch axes of left, sequence axis present """
+    n = [np.random.random((4, 2, 3, 5, 6)).astype(np.float32),
+         np.random.random((7, 2, 3, 5, 6)).astype(np.float32)]
+    m = np.random.random((6, 4)).astype(np.float32)
+
+    a = C.sequence.input_variable((2, 3, 5, 6))
+    b = C.constant(m)
+
+    c = batchmatmul(a, b, batch_rank=2)
+    assert c.shape == (2, 3, 5, 4)
+
+    results = c.eval({a: n})
+
+    for result, nn in zip(results, n):
+        np.testing.assert_almost_equal(result, nn @ m, decimal=5)
+
+
+def test_batchmatmul_broadcast_left():
+    """ left operand without batch axis is broadcast over batch axis of right """
+    dynamic_batch = 2
+    n = np.random.random((dynamic_batch, 5, 6)).astype(np.float32)
+    m = np.random.random((dynamic_batch, 3, 6, 4)).astype(np.float32)
+
+    a = C.input_variable((5, 6))
+    b = C.input_variable((3, 6, 4))
+
+    c = batchmatmul(a, b, batch_rank=0)
+    assert c.shape == (3, 5, 4)
+
+    result = c.eval({a: n, b: m})
+    np.testing.assert_almost_equal(result, n[:, None, ...] @ m, decimal=5)
+
+
+def test_batchmatmul_multiple_batch_axes():
+    """ multiple batch axes on both operands, including broadcast of axes of dimension 1 """
+    dynamic_batch = 2
+    n = np.random.random((dynamic_batch, 2, 3, 5, 6)).astype(np.float32)
+    m = np.random.random((dynamic_batch, 2, 3, 6, 4)).astype(np.float32)
+
+    a = C.input_variable((2, 3, 5, 6))
+    b = C.input_variable((2, 3, 6, 4))
+
+    c = batchmatmul(a, b, batch_rank=2)
+    assert c.shape == (2, 3, 5, 4)
+    np.testing.assert_almost_equal(c.eval({a: n, b: m}), n @ m, decimal=5)
+
+    n = np.random.random((dynamic_batch, 2, 1, 5, 6)).astype(np.float32)
+    m = np.random.random((dynamic_batch, 3, 6, 4)).astype(np.float32)
+
+    a = C.input_variable((2, 1, 5, 6))
+    b = C.input_variable((3, 6, 4))
+
+    c = batchmatmul(a, b, batch_rank=2)
+    assert c.shape == (2, 3, 5, 4)
+    np.testing.assert_almost_equal(c.eval({a: n, b: m}), n @ m[:, None, ...], decimal=5)
+
+    with pytest.raises(ValueError):
+        batchmatmul(C.input_variable((2, 5, 6)), C.input_variable((3, 6, 4)))